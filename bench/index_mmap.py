@@ -0,0 +1,134 @@
+# bench/index_mmap.py
+# index.faiss 일반 로드 vs mmap 로드 비교 (워커 N개가 동시에 같은 index를 연 상태에서 측정)
+# - startup: read_index 시간
+# - RssAnon: 프로세스 전용 메모리 (워커 수만큼 늘어나는 부분)
+# - RssFile: 파일 기반 메모리 (page cache, 워커끼리 공유)
+# - Pss    : 공유 페이지를 나눠서 계산한 비례 메모리 → 합계가 실제 서버 메모리 사용량에 가까움
+# 실행 (repo 루트에서):
+#   python -m bench.index_mmap --workers 4                      # 지금 snapshot의 index.faiss
+#   python -m bench.index_mmap --synthetic 200000 --dim 1536    # 합성 index로 측정
+import argparse
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+import faiss
+
+from rag.rag_core import load_index
+from rag.snapshots import current_paths
+
+
+def read_mem_kb() -> dict:
+    out = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "RssAnon:", "RssFile:")):
+                out[line.split(":")[0]] = int(line.split()[1])
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    out["Pss"] = int(line.split()[1])
+    except OSError:
+        pass
+    return out
+
+
+def worker(path, use_mmap, ready, done, results):
+    t0 = time.perf_counter()
+    index = load_index(path, use_mmap)
+    load_s = time.perf_counter() - t0
+
+    # 실제 서비스처럼 전체를 한 번 스캔 (flat index면 모든 페이지를 건드림)
+    q = np.random.default_rng(0).standard_normal((1, index.d)).astype("float32")
+    faiss.normalize_L2(q)
+    t0 = time.perf_counter()
+    index.search(q, 5)
+    search_s = time.perf_counter() - t0
+
+    ready.wait()  # 모든 워커가 로드를 끝낸 상태에서 메모리 측정
+    results.put({"load_seconds": load_s, "search_seconds": search_s, **read_mem_kb()})
+    done.wait()
+
+
+def run(path, use_mmap, n_workers):
+    ctx = mp.get_context("spawn")
+    ready = ctx.Barrier(n_workers + 1)
+    done = ctx.Barrier(n_workers + 1)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(path, use_mmap, ready, done, results)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    ready.wait()
+    rows = [results.get() for _ in procs]
+    done.wait()
+    for p in procs:
+        p.join()
+
+    def total(key):
+        return sum(r.get(key, 0) for r in rows) / 1024
+
+    return {
+        "workers": n_workers,
+        "mmap": use_mmap,
+        "load_seconds_max": max(r["load_seconds"] for r in rows),
+        "search_seconds_max": max(r["search_seconds"] for r in rows),
+        "rss_anon_mb_total": total("RssAnon"),
+        "rss_file_mb_total": total("RssFile"),
+        "pss_mb_total": total("Pss"),
+    }
+
+
+def make_synthetic(n, dim):
+    x = np.random.default_rng(0).standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(x)
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    index.add_with_ids(x, np.arange(n, dtype=np.int64))
+    fd, path = tempfile.mkstemp(suffix=".faiss")
+    os.close(fd)
+    faiss.write_index(index, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="heap vs mmap FAISS index loading across workers")
+    parser.add_argument("--index", default=None, help="기본: 지금 publish된 snapshot의 index.faiss")
+    parser.add_argument("--synthetic", type=int, default=0, help="N개 합성 벡터로 index 생성해서 측정")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--out", default="", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    path = make_synthetic(args.synthetic, args.dim) if args.synthetic else (args.index or current_paths()[1]["index"])
+    try:
+        report = {
+            "index": path,
+            "index_file_mb": os.path.getsize(path) / 2**20,
+            "heap": run(path, False, args.workers),
+            "mmap": run(path, True, args.workers),
+        }
+    finally:
+        if args.synthetic:
+            os.remove(path)
+
+    print(f"index file: {report['index_file_mb']:.1f} MB, workers: {args.workers}")
+    for name in ("heap", "mmap"):
+        r = report[name]
+        print(
+            f"{name:5s} load {r['load_seconds_max'] * 1000:7.1f} ms | "
+            f"anon {r['rss_anon_mb_total']:7.1f} MB | file {r['rss_file_mb_total']:7.1f} MB | "
+            f"pss {r['pss_mb_total']:7.1f} MB"
+        )
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"- saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
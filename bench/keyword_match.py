@@ -0,0 +1,107 @@
+# bench/keyword_match.py
+# 키워드 게이트 micro-benchmark
+# - before: 예전 방식 (crisis / topic / alias 목록을 각각 `k in text`로 선형 스캔, 3번)
+# - after : rag.keyword_matcher (Aho-Corasick으로 한 번 스캔)
+# 키워드 표를 합성 키워드로 N배 늘려가며 메시지 1개당 처리 시간을 비교
+# 실행 (repo 루트에서): python -m bench.keyword_match [--sizes 0,1000,10000] [--out ...]
+import argparse
+import json
+import os
+import random
+import time
+
+from rag.keyword_matcher import KeywordMatcher, load_keywords
+
+MESSAGES = [
+    "우울증이 뭐예요?",
+    "스트레스는 왜 생기나요?",
+    "불안 장애에는 어떤 종류가 있나요?",
+    "ADHD는 어떤 증상이 있나요?",
+    "PTSD는 시간이 지나면 나아지나요?",
+    "요즘 너무 힘들어서 죽고 싶다는 생각이 들어요",
+    "오늘 점심 메뉴 추천해줘",
+    "What is the difference between bipolar disorder and depression?",
+]
+
+
+def naive_scan(keywords, text):
+    # 예전 rag_core / chatbot 코드와 같은 방식
+    t = (text or "").lower()
+    crisis = any(k in t for k in keywords["crisis"])
+    topic = any(k in t for k in keywords["topic"])
+    extras = [v for k, v in keywords["aliases"].items() if k in t]
+    return crisis, topic, extras
+
+
+def grow(keywords, extra: int, seed: int = 0):
+    """합성 키워드(한글 음절 조합)를 extra개 추가한 키워드 표 (동의어/오타/띄어쓰기 변형을 흉내)"""
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(chr(rng.randint(0xAC00, 0xD7A3)) for _ in range(rng.randint(2, 5)))
+
+    kw = {"crisis": list(keywords["crisis"]), "topic": list(keywords["topic"]), "aliases": dict(keywords["aliases"])}
+    for i in range(extra):
+        w = word()
+        if i % 10 == 0:
+            kw["crisis"].append(w)
+        elif i % 10 < 8:
+            kw["topic"].append(w)
+        else:
+            kw["aliases"][w] = "synthetic alias expansion"
+    return kw
+
+
+def time_per_message_us(fn, repeat: int):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for m in MESSAGES:
+            fn(m)
+    return (time.perf_counter() - t0) / (repeat * len(MESSAGES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="linear keyword scans vs single-pass Aho-Corasick")
+    parser.add_argument("--sizes", default="0,1000,10000", help="추가할 합성 키워드 수 (쉼표 구분)")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    base = load_keywords()
+    rows = []
+    for extra in [int(x) for x in args.sizes.split(",")]:
+        kw = grow(base, extra)
+        n_terms = len(kw["crisis"]) + len(kw["topic"]) + len(kw["aliases"])
+
+        t0 = time.perf_counter()
+        matcher = KeywordMatcher(kw)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        # 결과가 예전 방식과 같은지 확인
+        for m in MESSAGES:
+            crisis, topic, extras = naive_scan(kw, m)
+            got = matcher.match(m)
+            assert (bool(got.crisis), bool(got.topics), matcher.alias_expansions(got)) == (crisis, topic, extras), m
+
+        row = {
+            "n_terms": n_terms,
+            "build_ms": build_ms,
+            "naive_us": time_per_message_us(lambda m: naive_scan(kw, m), args.repeat),
+            "aho_us": time_per_message_us(matcher.match, args.repeat),
+        }
+        rows.append(row)
+
+        print(
+            f"terms {n_terms:6d} | naive {row['naive_us']:9.2f} us | "
+            f"aho {row['aho_us']:7.2f} us | build {build_ms:7.1f} ms"
+        )
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"- saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
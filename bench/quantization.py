@@ -0,0 +1,122 @@
+# bench/quantization.py
+# 벡터 저장 방식 벤치마크: float32 flat(현재 기본) 대비 sq8 / fp16 / 차원 축소(truncate)
+# - 같은 벡터로 (차원 x quantize) 조합마다 index를 만들고
+#   recall@k (원래 차원 float32 flat의 정확한 top-k 기준) / index 크기 / 검색 latency 비교
+# - --from-index: 실제 빌드 결과(float32 flat index)의 벡터를 그대로 사용 → 실제 임베딩 기준 숫자
+#   없으면 합성 벡터 (앞쪽 차원일수록 분산이 큰 군집 데이터, text-embedding-3처럼 앞쪽에 정보가 몰린 경우 흉내)
+#   → 합성 벡터의 truncate recall은 참고용, 실제 판단은 --from-index로
+# 실행 (repo 루트에서):
+#   python -m bench.quantization                                      # 합성 20k x 1536
+#   python -m bench.quantization --from-index data/snapshots/<build_id>/index.faiss --dims full,512,256
+import argparse
+import json
+import os
+
+import numpy as np
+import faiss
+
+from rag.index_types import QUANTIZERS, default_params, build_and_fill, make_queries, _latencies_ms
+
+
+def synthetic_vectors(n: int, dim: int, n_clusters: int = 200, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    scale = (1.0 / np.sqrt(1.0 + np.arange(dim) / 64.0)).astype("float32")
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32") * scale
+    x = centers[rng.integers(0, n_clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype("float32") * scale
+    faiss.normalize_L2(x)
+    return x
+
+
+def load_vectors(index_path: str) -> np.ndarray:
+    """IDMap2(Flat) index에서 벡터 꺼내기"""
+    index = faiss.read_index(index_path)
+    inner = faiss.downcast_index(index.index)
+    if not isinstance(inner, faiss.IndexFlat):
+        raise ValueError("--from-index는 float32 flat index만 지원합니다 (quantize 없이 빌드한 것).")
+    return inner.reconstruct_n(0, index.ntotal)
+
+
+def truncate(v: np.ndarray, dim: int) -> np.ndarray:
+    out = np.ascontiguousarray(v[:, :dim], dtype="float32")
+    faiss.normalize_L2(out)
+    return out
+
+
+def run(vectors, dims, quantizers, index_type, k, n_queries, train_size):
+    ids = np.arange(len(vectors), dtype=np.int64)
+    queries = make_queries(vectors, n_queries)
+    k = min(k, len(vectors))
+
+    exact = build_and_fill("flat", vectors, ids, {}, train_size)
+    _, exact_ids = exact.search(queries, k)
+    base_bytes = int(faiss.serialize_index(exact).size)
+
+    rows = []
+    for dim in dims:
+        v, q = (vectors, queries) if dim == vectors.shape[1] else (truncate(vectors, dim), truncate(queries, dim))
+        for quantize in quantizers:
+            params = {**default_params(index_type, len(v), dim), "quantize": quantize}
+            index = build_and_fill(index_type, v, ids, params, train_size)
+            _, got = index.search(q, k)
+            recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(got.tolist(), exact_ids.tolist())])
+            lat = _latencies_ms(index, q, k)
+            size = int(faiss.serialize_index(index).size)
+            rows.append({
+                "dim": dim,
+                "quantize": quantize,
+                f"recall@{k}": float(recall),
+                "index_bytes": size,
+                "bytes_per_vector": size / len(v),
+                "memory_saved": 1 - size / base_bytes,
+                "latency_ms_p50": float(np.percentile(lat, 50)),
+            })
+    return {"n_vectors": len(vectors), "dim": int(vectors.shape[1]), "index_type": index_type, "k": k,
+            "n_queries": len(queries), "results": rows}
+
+
+def print_report(report):
+    k = report["k"]
+    print(
+        f"=== quantization (n={report['n_vectors']}, dim={report['dim']}, {report['index_type']}, "
+        f"queries={report['n_queries']}) — 기준: float32 flat, 원래 차원 ==="
+    )
+    print(f"{'dim':>6s} {'quantize':>8s} {'recall@' + str(k):>10s} {'B/vec':>8s} {'size MB':>9s} {'saved':>7s} {'p50 ms':>8s}")
+    for r in report["results"]:
+        print(
+            f"{r['dim']:6d} {r['quantize']:>8s} {r[f'recall@{k}']:10.4f} {r['bytes_per_vector']:8.0f} "
+            f"{r['index_bytes'] / 2**20:9.2f} {r['memory_saved']:7.1%} {r['latency_ms_p50']:8.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="memory vs recall: sq8 / fp16 / truncated dims")
+    parser.add_argument("--from-index", default="", help="float32 flat index 파일 (없으면 합성 벡터)")
+    parser.add_argument("--n", type=int, default=20_000, help="합성 벡터 수")
+    parser.add_argument("--dim", type=int, default=1536, help="합성 벡터 차원")
+    parser.add_argument("--dims", default="full,768,512,256", help="비교할 차원 (쉼표 구분, full = 원래 차원)")
+    parser.add_argument("--quantize", default=",".join(QUANTIZERS), help="비교할 quantize (쉼표 구분)")
+    parser.add_argument("--index-type", default="flat", choices=("flat", "hnsw", "ivf_flat"))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--train-size", type=int, default=100_000)
+    parser.add_argument("--out", default="", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.from_index) if args.from_index else synthetic_vectors(args.n, args.dim)
+    full = vectors.shape[1]
+    dims = [full if d == "full" else int(d) for d in args.dims.split(",")]
+    dims = [d for d in dims if d <= full]
+    quantizers = [q.strip() for q in args.quantize.split(",") if q.strip()]
+
+    report = run(vectors, dims, quantizers, args.index_type, args.k, args.queries, args.train_size)
+    print_report(report)
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"- saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
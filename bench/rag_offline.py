@@ -0,0 +1,176 @@
+# bench/rag_offline.py
+# 오프라인 벤치마크 (stub 임베딩 / stub chat → API 키, 네트워크 불필요)
+# 합성 코퍼스(chunks.jsonl 스키마) 크기별로:
+# - build : rag.build_index 전체 빌드 시간 + 최대 RSS (새 프로세스에서 실행)
+# - retrieve() : 쿼리 1개씩 latency p50/p95/p99 + 처리량(qps)
+# - meta lookup: meta.get_many(k개 id) 비용
+# - answer()   : stub chat으로 전체 파이프라인 (생성 비용 0 → 나머지 오버헤드만 남음)
+# stub 벡터는 의미가 없으므로 recall은 재지 않음 (검색 품질은 rag.index_types 리포트 참고)
+# 실행 (repo 루트에서):
+#   python -m bench.rag_offline                                  # 1k / 100k / 1M
+#   python -m bench.rag_offline --sizes 1000 --out bench/results/rag_offline.json
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bench.stubs import StubEmbedder, StubChatClient, synthetic_chunks, WORDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 자식 프로세스: build_index의 임베딩 백엔드만 stub으로 바꿔서 main() 실행
+CHILD = """
+import json, resource, sys, time
+import rag.build_index as b
+from bench.stubs import StubEmbedder
+dim, index_type = int(sys.argv[1]), sys.argv[2]
+b.get_embedder = lambda *a, **kw: StubEmbedder(dim)
+sys.argv = ["build_index", "--checkpoint-dir", "", "--no-warm", "--index-type", index_type]
+t0 = time.perf_counter()
+b.main()
+elapsed = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "max_rss_mb": rss_kb / 1024}))
+"""
+
+
+def latency_stats(seconds) -> dict:
+    a = np.asarray(seconds) * 1000
+    return {
+        "n": int(len(a)),
+        "p50_ms": float(np.percentile(a, 50)),
+        "p95_ms": float(np.percentile(a, 95)),
+        "p99_ms": float(np.percentile(a, 99)),
+        "qps": float(len(a) / (a.sum() / 1000)) if a.sum() else 0.0,
+    }
+
+
+def write_corpus(workdir: str, n: int) -> float:
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    t0 = time.perf_counter()
+    with open(os.path.join(workdir, "data", "chunks.jsonl"), "w", encoding="utf-8") as f:
+        for d in synthetic_chunks(n):
+            f.write(json.dumps(d, ensure_ascii=False) + "\n")
+    return time.perf_counter() - t0
+
+
+def run_build(workdir: str, dim: int, index_type: str) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, str(dim), index_type],
+        cwd=workdir, capture_output=True, text=True, env=env, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def make_queries(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    # "우울증": 정신건강 키워드 게이트 통과용
+    return [f"우울증 {' '.join(rng.choices(WORDS, k=8))} {i}" for i in range(n)]
+
+
+def bench_queries(n_chunks: int, dim: int, n_queries: int, k: int) -> dict:
+    """현재 디렉터리(data/)의 빌드 결과로 retrieve / meta lookup / answer 측정"""
+    import rag.rag_core as rc
+    from rag.build_index import str_id_to_int64
+
+    rc.EMBED_CACHE_PATH = ""   # 디스크 캐시 없이 (매 실행 같은 조건)
+    rc.MIN_SCORE = -1.0        # stub 벡터는 점수가 낮아서 컷에 다 걸림 → 컨텍스트 구성까지 가도록
+
+    t0 = time.perf_counter()
+    engine = rc.RagEngine(embedder=StubEmbedder(dim), client=StubChatClient())
+    load_s = time.perf_counter() - t0
+    rc.set_engine(engine)
+
+    queries = make_queries(n_queries)
+    rc.retrieve(queries[0], k)  # warm-up
+
+    lat = []
+    for q in queries:
+        t0 = time.perf_counter()
+        rc.retrieve(q, k)
+        lat.append(time.perf_counter() - t0)
+    retrieve = latency_stats(lat)
+
+    rng = random.Random(2)
+    lookups = [
+        [int(str_id_to_int64(f"synthetic_{rng.randrange(n_chunks):07d}")) for _ in range(k)]
+        for _ in range(n_queries)
+    ]
+    lat = []
+    for ids in lookups:
+        t0 = time.perf_counter()
+        engine.meta.get_many(ids)
+        lat.append(time.perf_counter() - t0)
+    meta = latency_stats(lat)
+
+    lat = []
+    with contextlib.redirect_stdout(io.StringIO()):  # _build_messages의 debug print
+        for q in make_queries(n_queries, seed=3):
+            t0 = time.perf_counter()
+            rc.answer(q, k)
+            lat.append(time.perf_counter() - t0)
+    answer = latency_stats(lat)
+
+    engine.meta.close()
+    rc.set_engine(None)
+    return {"engine_load_seconds": load_s, "retrieve": retrieve, "meta_lookup": meta, "answer": answer}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline build / retrieve / meta-lookup benchmark")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="코퍼스 크기 (쉼표 구분)")
+    parser.add_argument("--dim", type=int, default=256, help="stub 임베딩 차원 (1M x 1536은 메모리 6GB+)")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--keep", action="store_true", help="작업 디렉터리를 지우지 않음")
+    parser.add_argument("--out", default="", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    report = {"dim": args.dim, "index_type": args.index_type, "k": args.k, "results": {}}
+    for n in [int(x) for x in args.sizes.split(",")]:
+        workdir = tempfile.mkdtemp(prefix=f"rag_bench_{n}_")
+        try:
+            corpus_s = write_corpus(workdir, n)
+            build = run_build(workdir, args.dim, args.index_type)
+            os.chdir(workdir)
+            try:
+                queries = bench_queries(n, args.dim, args.queries, args.k)
+            finally:
+                os.chdir(cwd)
+        finally:
+            if args.keep:
+                print(f"- workdir: {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        row = {"corpus_seconds": corpus_s, "build": build, **queries}
+        report["results"][str(n)] = row
+        print(
+            f"n={n:8d} | build {build['seconds']:7.2f} s, rss {build['max_rss_mb']:7.1f} MB | "
+            f"retrieve p50 {row['retrieve']['p50_ms']:7.3f} ms ({row['retrieve']['qps']:7.0f} qps) | "
+            f"meta p50 {row['meta_lookup']['p50_ms'] * 1000:6.1f} us | "
+            f"answer p50 {row['answer']['p50_ms']:7.3f} ms"
+        )
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"- saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
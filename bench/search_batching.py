@@ -0,0 +1,94 @@
+# bench/search_batching.py
+# 동시 검색 micro-benchmark: 스레드 T개가 (1, d) 쿼리로 동시에 search
+# - direct : 각 스레드가 index.search를 따로 (예전 방식)
+# - batched: rag.search_batcher.SearchBatcher로 묶어서
+# FAISS 스레드 수(--faiss-threads)별로 처리량(qps)과 latency p50/p95 비교
+# 실행 (repo 루트에서): python -m bench.search_batching [--n 100000] [--dim 256] [--clients 1,8,32]
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import faiss
+
+from rag.search_batcher import SearchBatcher, configure_faiss
+
+
+def run_clients(search, queries, n_clients: int, k: int):
+    """n_clients개 스레드가 queries를 나눠서 하나씩 검색 → (전체 초, 쿼리별 latency 초)"""
+    lat = [[] for _ in range(n_clients)]
+    start = threading.Barrier(n_clients + 1)
+
+    def worker(c):
+        start.wait()
+        for i in range(c, len(queries), n_clients):
+            t0 = time.perf_counter()
+            search(queries[i:i + 1], k)
+            lat[c].append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in range(n_clients)]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0, np.concatenate([np.array(x) for x in lat if x])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="concurrent FAISS search: direct vs micro-batched")
+    parser.add_argument("--n", type=int, default=100_000, help="index 벡터 수 (flat)")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--clients", default="1,8,32", help="동시 검색 스레드 수 (쉼표 구분)")
+    parser.add_argument("--faiss-threads", default=f"1,{os.cpu_count() or 1}", help="FAISS OpenMP 스레드 수 (쉼표 구분)")
+    parser.add_argument("--window-ms", type=float, default=0.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--out", default="", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((args.n, args.dim)).astype("float32")
+    faiss.normalize_L2(x)
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(args.dim))
+    index.add_with_ids(x, np.arange(args.n, dtype=np.int64))
+    queries = rng.standard_normal((args.queries, args.dim)).astype("float32")
+    faiss.normalize_L2(queries)
+
+    batcher = SearchBatcher(window_ms=args.window_ms, max_batch=args.max_batch)
+    modes = {"direct": index.search, "batched": lambda q, k: batcher.search(index, q, k)}
+
+    rows = []
+    print(f"=== concurrent search (flat n={args.n}, dim={args.dim}, queries={args.queries}, k={args.k}) ===")
+    print(f"{'omp':>4s} {'clients':>8s} {'mode':>8s} {'qps':>9s} {'p50 ms':>8s} {'p95 ms':>8s}")
+    for omp in [int(t) for t in args.faiss_threads.split(",")]:
+        configure_faiss(omp)
+        for clients in [int(c) for c in args.clients.split(",")]:
+            for mode, search in modes.items():
+                search(queries[:1], args.k)  # warm-up
+                total, lat = run_clients(search, queries, clients, args.k)
+                row = {
+                    "faiss_threads": omp, "clients": clients, "mode": mode,
+                    "qps": len(queries) / total,
+                    "p50_ms": float(np.percentile(lat, 50) * 1000),
+                    "p95_ms": float(np.percentile(lat, 95) * 1000),
+                }
+                rows.append(row)
+                print(
+                    f"{omp:4d} {clients:8d} {mode:>8s} {row['qps']:9.0f} "
+                    f"{row['p50_ms']:8.3f} {row['p95_ms']:8.3f}"
+                )
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"n": args.n, "dim": args.dim, "results": rows}, f, ensure_ascii=False, indent=2)
+        print(f"- saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench/startup.py
+# 콜드 스타트 측정: 매번 새 파이썬 프로세스에서 아래 시나리오를 실행하고 시간/RSS를 기록
+# 실행 (repo 루트에서): python -m bench.startup [--runs 5] [--out bench/results/startup.json]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    # 챗봇을 열지 않는 사용자 (인트로/매뉴얼 페이지만)
+    "pages_only": "from page import intro, project1, project2",
+    # app_multipage.py 처럼 챗봇 페이지까지 import (엔진은 아직 생성 안 됨)
+    "with_chatbot_page": "from page import intro, project1, project2, chatbot",
+    # 챗봇 첫 질문 시점: index/meta 로드 + OpenAI client 생성까지
+    "with_engine": (
+        "from page import intro, project1, project2, chatbot\n"
+        "from rag.rag_core import get_engine\n"
+        "get_engine()"
+    ),
+}
+
+# 자식 프로세스에서 실행되는 코드: 시나리오 실행 시간과 최대 RSS를 JSON 한 줄로 출력
+CHILD = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+exec(compile(sys.argv[1], "<scenario>", "exec"))
+elapsed = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "max_rss_mb": rss_kb / 1024}))
+"""
+
+
+def run_once(code: str) -> dict:
+    env = dict(os.environ)
+    # client 생성만 하고 요청은 보내지 않으므로 키가 없으면 더미 값 사용
+    env.setdefault("OPENAI_API_KEY", "bench-dummy-key")
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, code],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cold-start time with / without the chatbot page")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", default="", help="결과 JSON 저장 경로 (없으면 출력만)")
+    args = parser.parse_args()
+
+    report = {}
+    for name, code in SCENARIOS.items():
+        runs = [run_once(code) for _ in range(args.runs)]
+        secs = [r["seconds"] for r in runs]
+        report[name] = {
+            "runs": args.runs,
+            "median_seconds": statistics.median(secs),
+            "min_seconds": min(secs),
+            "max_rss_mb": max(r["max_rss_mb"] for r in runs),
+        }
+        print(f"{name:20s} median {report[name]['median_seconds'] * 1000:8.1f} ms"
+              f"  rss {report[name]['max_rss_mb']:7.1f} MB")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"- saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench/stubs.py
+# 오프라인 벤치마크용 stub (네트워크 / API 키 / 모델 파일 없이 동작)
+# - StubEmbedder  : rag.embedders 인터페이스, 텍스트 해시로 시드를 정한 랜덤 단위 벡터
+#                   (의미는 없지만 같은 텍스트 → 같은 벡터, 텍스트당 비용이 거의 일정)
+# - StubChatClient: client.chat.completions.create(...) 흉내 (stream=True 지원)
+# - synthetic_chunks: chunks.jsonl 스키마의 합성 청크
+import random
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+STUB_ANSWER = "합성 코퍼스 기반의 벤치마크용 답변입니다."
+
+WORDS = (
+    "depression anxiety stress sleep mood therapy symptoms treatment support health "
+    "mental disorder care family work school panic trauma recovery risk signs help "
+    "community services medication counseling wellbeing emotion behavior thoughts"
+).split()
+
+
+class StubEmbedder:
+    name = "stub"
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.model = f"stub-{dim}"
+
+    def embed(self, texts) -> np.ndarray:
+        texts = list(texts)
+        v = np.empty((len(texts), self.dim), dtype="float32")
+        for i, t in enumerate(texts):
+            rng = np.random.default_rng(zlib.crc32((t or "").encode("utf-8")))
+            v[i] = rng.standard_normal(self.dim, dtype=np.float32)
+        v /= np.linalg.norm(v, axis=1, keepdims=True)
+        return v
+
+
+def _message(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class _Completions:
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        if stream:
+            return iter([_chunk(w + " ") for w in STUB_ANSWER.split()])
+        return _message(STUB_ANSWER)
+
+
+class StubChatClient:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_Completions())
+
+
+def synthetic_chunks(n: int, words_per_chunk: int = 80, seed: int = 0):
+    """chunks.jsonl 스키마 (id, source, title, url, text) 청크 n개를 생성하는 제너레이터"""
+    rng = random.Random(seed)
+    for i in range(n):
+        topic = rng.choice(WORDS)
+        yield {
+            "id": f"synthetic_{i:07d}",
+            "source": "SYNTH",
+            "title": f"{topic.title()} — part {i}",
+            "url": f"https://example.org/synthetic/{i}",
+            "text": " ".join(rng.choices(WORDS, k=words_per_chunk)),
+        }
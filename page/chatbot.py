@@ -1,18 +1,17 @@
 # page/ragchatbot.py
 import streamlit as st
-from rag.rag_core import answer
+from rag.rag_core import answer, answer_stream, metrics_snapshot
+from rag.keyword_matcher import match_keywords
+from rag import metrics, warm_answers
+from utils.chat_history import ChatHistory, bubble_html, message_html
+
+# 한 번에 그리는 최근 메시지 수 ("이전 대화 더 보기"를 누르면 이만큼씩 늘어남)
+HISTORY_WINDOW = 20
 
 
 def is_crisis_message(text: str) -> bool:
-    t = (text or "").lower()
-    keywords = [
-        # 한국어
-        "죽고 싶", "자살", "자해", "목숨", "끝내고 싶", "극단적 선택",
-        "살기 싫", "죽을래", "죽어버", "죽고싶", "살기 힘들", "죽을까",
-        # 영어
-        "suicide", "kill myself", "end my life", "self-harm", "self harm",
-    ]
-    return any(k in t for k in keywords)
+    # 위기 문구 목록은 rag/keywords.json ("crisis") 에서 관리
+    return bool(match_keywords(text).crisis)
 
 
 def crisis_banner():
@@ -24,11 +23,33 @@ def crisis_banner():
     )
 
 
-def handle_question(q: str):
+def live_bubbles_html(q: str, partial: str) -> str:
+    """스트리밍 중인 (질문, 답변 조각)을 채팅 말풍선 형태로"""
+    bot = message_html(partial) + "▌" if partial else "답변 생성 중..."
+    return bubble_html("user", q) + '<div class="row bot"><div class="bubble bot">' + bot + "</div></div>"
+
+
+def stream_answer(q: str, live) -> str:
+    """answer_stream 토큰을 live(st.empty) 자리에 점점 그려주고, 최종 답변을 반환"""
+    live.markdown(live_bubbles_html(q, ""), unsafe_allow_html=True)
+
+    parts = []
+    bot_answer = ""
+    for ev in answer_stream(q, k=4):
+        if ev["type"] == "token":
+            parts.append(ev["text"])
+            live.markdown(live_bubbles_html(q, "".join(parts)), unsafe_allow_html=True)
+        elif ev["type"] == "done":
+            bot_answer = ev.get("answer", "")
+    return bot_answer
+
+
+def handle_question(q: str, live=None):
     """
     - 위기 문구면: chat_history에 쌓고, '배너 표시 상태'를 session_state로 저장
       (rerun 이후에도 배너 유지)
     - 정상 문구면: 배너 숨김 + RAG 답변 생성
+      (live 자리가 주어지면 토큰 단위로 스트리밍해서 보여줌)
     """
     q = (q or "").strip()
     if not q:
@@ -37,9 +58,9 @@ def handle_question(q: str):
 
     # 위기 상황 처리
     if is_crisis_message(q):
-        st.session_state.chat_history.append(("user", q))
-        st.session_state.chat_history.append(
-            ("bot", "위기 상황일 수 있어요. 지금은 안전 안내를 먼저 제공할게요.")
+        st.session_state.chat_history.add("user", q)
+        st.session_state.chat_history.add(
+            "bot", "위기 상황일 수 있어요. 지금은 안전 안내를 먼저 제공할게요."
         )
         st.session_state.show_crisis_banner = True  # ✅ rerun에도 유지
         return
@@ -47,30 +68,50 @@ def handle_question(q: str):
     # 정상 질문이면 배너 숨김
     st.session_state.show_crisis_banner = False
 
-    st.session_state.chat_history.append(("user", q))
-    with st.spinner("답변 생성 중..."):
-        result = answer(q, k=4)
-        bot_answer = result.get("answer", "")
-
-    st.session_state.chat_history.append(("bot", bot_answer))
-
-
-def render_sample_questions():
+    st.session_state.chat_history.add("user", q)
+    if live is not None:
+        bot_answer = stream_answer(q, live)
+    else:
+        with st.spinner("답변 생성 중..."):
+            result = answer(q, k=4)
+            bot_answer = result.get("answer", "")
+
+    st.session_state.chat_history.add("bot", bot_answer)
+
+
+def render_metrics_panel():
+    """사이드바: 단계별 지연 시간 / 카운터 (RAG_METRICS=1 일 때만 표시)"""
+    snap = metrics_snapshot()
+    with st.sidebar.expander("⏱️ RAG 파이프라인 지연 시간", expanded=False):
+        if not snap["stages"]:
+            st.caption("아직 수집된 요청이 없어요.")
+            return
+        rows = [
+            {
+                "stage": stage,
+                "count": s["count"],
+                "p50 ms": round(s["p50_ms"], 1),
+                "p95 ms": round(s["p95_ms"], 1),
+                "p99 ms": round(s["p99_ms"], 1),
+            }
+            for stage, s in snap["stages"].items()
+        ]
+        st.table(rows)
+        if snap["counters"]:
+            st.json(snap["counters"])
+
+
+def render_sample_questions(live=None):
     """채팅이 비어있을 때, 입력창 바로 위에 예시 질문 버튼을 보여줌"""
     st.markdown("#### 💡 예시 질문 (눌러서 바로 전송)")
-    samples = [
-        "우울증이 뭐예요?",
-        "스트레스는 왜 생기나요?",
-        "불안 장애에는 어떤 종류가 있나요?",
-        "ADHD는 어떤 증상이 있나요?",
-        "PTSD는 시간이 지나면 나아지나요?",
-    ]
+    # 목록은 rag/sample_questions.json (빌드 때 답변을 미리 만들어 둬서 바로 나옴)
+    samples = warm_answers.SAMPLE_QUESTIONS
 
     cols = st.columns(2)
     for i, q in enumerate(samples):
         with cols[i % 2]:
             if st.button(q, use_container_width=True, key=f"sample_{i}"):
-                handle_question(q)
+                handle_question(q, live)
                 st.rerun()
 
     st.caption("※ 예시 버튼도 일반 질문과 동일하게 RAG 파이프라인으로 처리돼요.")
@@ -85,6 +126,12 @@ def app():
         "<i>스트레스랑 불안은 무슨 관계가 있어?</i></small>",
         unsafe_allow_html=True
     )
+
+    if metrics.enabled():
+        render_metrics_panel()
+
+    # 예시 질문 답변이 지금 index 것이 아니면 백그라운드로 다시 생성 (빌드 때 --no-warm 등)
+    warm_answers.refresh_async()
     
     st.markdown(
         """
@@ -139,40 +186,51 @@ def app():
     )
 
     # --- session init ---
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+    # 최근 메시지만 그대로, 오래된 것은 압축 보관 (utils/chat_history.py)
+    if not isinstance(st.session_state.get("chat_history"), ChatHistory):
+        history = ChatHistory()
+        for role, msg in st.session_state.get("chat_history") or []:  # 예전 list 형식 세션
+            history.add(role, msg)
+        st.session_state.chat_history = history
+    if "history_window" not in st.session_state:
+        st.session_state.history_window = HISTORY_WINDOW
 
     # ✅ rerun에도 유지되는 배너 상태
     if "show_crisis_banner" not in st.session_state:
         st.session_state.show_crisis_banner = False
 
-    # --- 채팅 영역 렌더링 ---
+    # --- 채팅 영역 렌더링 (최근 history_window개만) ---
+    history = st.session_state.chat_history
+    hidden = len(history) - st.session_state.history_window
+    if hidden > 0:
+        if st.button(f"⬆️ 이전 대화 더 보기 ({hidden}개)", key="more_history"):
+            st.session_state.history_window += HISTORY_WINDOW
+            st.rerun()
+    if history.dropped:
+        st.caption(f"※ 오래된 메시지 {history.dropped}개는 보관 한도를 넘어 삭제됐어요.")
+
     chat_html = ['<div class="chat-scroll">']
 
     # 채팅이 비어있으면 빈 화면 느낌 줄이기(선택)
-    if len(st.session_state.chat_history) == 0:
+    if len(history) == 0:
         chat_html.append(
             '<div style="color:#777; padding:10px; line-height:1.6;">'
             "아래에서 예시 질문을 눌러 시작하거나, 직접 질문을 입력해보세요."
             "</div>"
         )
 
-    for role, msg in st.session_state.chat_history:
-        if role == "user":
-            chat_html.append(
-                f'<div class="row user"><div class="bubble user">{msg}</div></div>'
-            )
-        else:
-            chat_html.append(
-                f'<div class="row bot"><div class="bubble bot">{msg}</div></div>'
-            )
+    # 말풍선 HTML은 메시지 추가 시 한 번만 만들어지고, 합친 결과도 캐시됨
+    chat_html.append(history.window_html(st.session_state.history_window))
 
     chat_html.append("</div>")
     st.markdown("\n".join(chat_html), unsafe_allow_html=True)
 
+    # 스트리밍 중인 답변이 그려질 자리 (rerun 후에는 chat_history 쪽으로 옮겨감)
+    live = st.empty()
+
     # ✅ 예시 질문 위치: 채팅 아래 + 입력 위 (처음 진입/대화 없을 때만)
     if len(st.session_state.chat_history) == 0:
-        render_sample_questions()
+        render_sample_questions(live)
 
     # --- 입력 폼 (Enter 전송) ---
     with st.form("chat_form", clear_on_submit=True):
@@ -196,5 +254,5 @@ def app():
     if not submitted:
         return
 
-    handle_question(user_question)
+    handle_question(user_question, live)
     st.rerun()
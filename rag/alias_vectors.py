@@ -0,0 +1,64 @@
+# rag/alias_vectors.py
+# 검색 확장 alias(keywords.json "aliases")의 임베딩을 미리 만들어 index와 같이 저장
+# - build_index: alias 확장 문구마다 한 번씩 임베딩 → snapshot 폴더의 alias_vectors.npz
+#   (임베딩 백엔드 키 + 문구를 같이 저장 → 백엔드/문구가 바뀐 항목은 로드 시 무시)
+# - rag_core: 쿼리는 원문 그대로 임베딩하고, 매치된 alias 벡터 평균과 가중 합 → 다시 정규화
+#   → 임베딩 API에 보내는 텍스트가 짧고 같은 질문이면 항상 같은 문자열 (임베딩 캐시 hit)
+import os
+
+import numpy as np
+
+ALIAS_VECTORS_PATH = "data/alias_vectors.npz"
+
+# 확장 쪽 가중치 (0이면 확장 안 함, 1이면 alias 벡터만)
+ALIAS_WEIGHT = float(os.environ.get("RAG_ALIAS_WEIGHT", "0.35"))
+
+
+def load_alias_vectors(path: str, model_key: str, aliases: dict) -> dict:
+    """alias 키 -> (d,) 벡터. 파일이 없거나 다른 백엔드/다른 문구로 만든 항목은 빠짐"""
+    if not os.path.exists(path):
+        return {}
+    with np.load(path) as z:
+        if str(z["model"]) != model_key:
+            return {}
+        return {
+            str(k): v.astype("float32")
+            for k, t, v in zip(z["keys"], z["texts"], z["vectors"])
+            if aliases.get(str(k)) == str(t)
+        }
+
+
+def save_alias_vectors(path: str, model_key: str, aliases: dict, embed_fn, base: str = None) -> int:
+    """
+    aliases(키 -> 확장 문구) 임베딩 저장 → 새로 임베딩한 개수
+    (이미 같은 백엔드/문구로 저장된 항목은 다시 임베딩하지 않음, base: 재사용할 이전 파일 (기본: path))
+    """
+    have = load_alias_vectors(base or path, model_key, aliases)
+    todo = [k for k in aliases if k not in have]
+    if todo:
+        for k, v in zip(todo, embed_fn([aliases[k] for k in todo])):
+            have[k] = v
+    keys = list(aliases)
+    dim = len(next(iter(have.values()))) if have else 0
+    tmp = path + ".tmp.npz"
+    np.savez(
+        tmp,
+        model=np.array(model_key),
+        keys=np.array(keys),
+        texts=np.array([aliases[k] for k in keys]),
+        vectors=np.array([have[k] for k in keys], dtype="float32").reshape(len(keys), dim),
+    )
+    os.replace(tmp, path)
+    return len(todo)
+
+
+def blend(qv: np.ndarray, alias_vecs: list, weight: float = None) -> np.ndarray:
+    """(1, d) 쿼리 벡터 + alias 벡터 평균 → (1, d) L2 정규화"""
+    weight = ALIAS_WEIGHT if weight is None else weight
+    if not alias_vecs or weight <= 0:
+        return qv
+    v = (1.0 - weight) * qv.reshape(-1) + weight * np.mean(alias_vecs, axis=0)
+    n = np.linalg.norm(v)
+    if n > 0:
+        v = v / n
+    return v.reshape(1, -1).astype("float32")
@@ -0,0 +1,127 @@
+# rag/answer_cache.py
+# 의미 기반 답변 캐시: "우울증이 뭐예요?" / "우울증이 뭐야?" 처럼 표현만 다른 질문은
+# GPT를 다시 부르지 않고 이전 답변을 그대로 돌려줌
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import faiss
+
+
+class SemanticCache:
+    """
+    (쿼리 벡터, 답변, citations, 인덱스 버전) 저장소
+
+    - 조회: 캐시 전용 소형 FAISS(IndexFlatIP) → 코사인 유사도 >= threshold 이면 hit
+    - 제거: max_items 초과 시 오래된 것부터, ttl(초) 지난 항목은 조회 시 제거
+    - 무효화: index_version(= 지금 snapshot 버전, 새 빌드가 publish되면 바뀜)이 바뀌면 전부 비움
+    - 쿼리 벡터는 L2 정규화된 (1, d) float32 라고 가정 (rag_core.embed 결과)
+    """
+
+    def __init__(self, threshold: float = 0.95, max_items: int = 512, ttl: float = 24 * 3600):
+        self.threshold = threshold
+        self.max_items = max_items
+        self.ttl = ttl
+
+        self._index = None          # 첫 store 때 차원을 보고 생성
+        self._entries = OrderedDict()  # entry_id -> dict (삽입 순서 = 오래된 순)
+        self._next_id = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _reset(self):
+        self._index = None
+        self._entries.clear()
+
+    def _check_version(self, index_version):
+        if index_version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._reset()
+            self._version = index_version
+
+    def _remove(self, entry_ids):
+        if not entry_ids:
+            return
+        self._index.remove_ids(np.array(entry_ids, dtype=np.int64))
+        for eid in entry_ids:
+            self._entries.pop(eid, None)
+
+    def lookup(self, qv: np.ndarray, index_version, k: int):
+        """hit이면 저장해 둔 결과(dict 복사본), 아니면 None"""
+        with self._lock:
+            self._check_version(index_version)
+            if self._index is None or self._index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            # 같은 질문이라도 k가 다르면 다른 답이므로 후보를 몇 개 더 봄
+            scores, ids = self._index.search(qv, min(4, self._index.ntotal))
+            now = time.time()
+            expired = []
+            found = None
+            for score, eid in zip(scores[0], ids[0]):
+                if eid == -1 or score < self.threshold:
+                    break
+                e = self._entries.get(int(eid))
+                if e is None:
+                    continue
+                if now - e["created"] > self.ttl:
+                    expired.append(int(eid))
+                    continue
+                if e["k"] == k:
+                    found = e
+                    break
+
+            self._remove(expired)
+            self.evictions += len(expired)
+
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(found["result"])
+
+    def store(self, qv: np.ndarray, result: dict, index_version, k: int):
+        with self._lock:
+            self._check_version(index_version)
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(qv.shape[1]))
+
+            eid = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(qv, np.array([eid], dtype=np.int64))
+            self._entries[eid] = {
+                "k": k,
+                "created": time.time(),
+                "result": copy.deepcopy(result),
+            }
+
+            overflow = len(self._entries) - self.max_items
+            if overflow > 0:
+                oldest = list(self._entries.keys())[:overflow]
+                self._remove(oldest)
+                self.evictions += overflow
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+            "threshold": self.threshold,
+        }
@@ -1,15 +1,30 @@
 # build_index.py (IDMap + string id support)
-import os, json, hashlib
+# 실행 (repo 루트에서): python -m rag.build_index [--incremental]
+import os, json, hashlib, argparse, uuid
 import numpy as np
 import faiss
-from openai import OpenAI
 
-DATA_PATH  = "data/chunks.jsonl"
-INDEX_PATH = "data/index.faiss"
-META_PATH  = "data/meta.json"
+from rag.embed_pipeline import EmbeddingPipeline
+from rag.embedders import BACKENDS, DEFAULT_OPENAI_MODEL, get_embedder, embedder_info, embedder_key
+from rag.alias_vectors import save_alias_vectors
+from rag.keyword_matcher import load_keywords
+from rag.context_builder import context_tokens
+from rag.dedup import DEDUP_THRESHOLD, find_duplicates
+from rag.warm_answers import WARM_PATH
+from rag.snapshots import MANIFEST_PATH, current_paths, new_snapshot, publish, prune
+from rag.meta_store import open_meta_store, write_meta_store, store_paths, compact_store_exists
+from rag.index_types import (
+    INDEX_TYPES, QUANTIZERS, default_params, search_param_names, supports_remove,
+    make_index, train_index, build_and_fill, compare_index_types, print_report,
+)
 
-EMBED_MODEL = "text-embedding-3-small"
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+DATA_PATH  = "data/chunks.jsonl"
+# 결과(index.faiss / index_info.json / meta.* / alias_vectors.npz)는 data/snapshots/<build_id>/ 에 쓰고
+# 다 쓴 뒤 data/manifest.json으로 publish (rag/snapshots.py) → 돌고 있는 서비스가 새 버전으로 교체
+#   - index_info.json: index 타입/파라미터 (rag_core가 읽어서 검색 파라미터 적용)
+#   - meta.json: 예전 형식 (--json-meta 일 때만 씀, 읽기는 fallback)
+REPORT_PATH = "data/index_report.json" # --report 결과
+CKPT_DIR   = "data/embed_ckpt"   # 임베딩 배치 체크포인트 (빌드가 끝나면 비움)
 
 
 def load_jsonl(path: str):
@@ -37,7 +52,198 @@ def str_id_to_int64(s: str) -> np.int64:
     return np.int64(u)
 
 
+def text_hash(text: str) -> str:
+    """청크 본문 해시 (증분 빌드에서 변경 여부 판단용)"""
+    return hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).hexdigest()
+
+
+def embed_texts(texts, pipeline: EmbeddingPipeline):
+    embeddings = pipeline.embed(texts)
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+
+def load_info(path):
+    # index_info.json이 없던 시절의 빌드는 전부 flat
+    if not os.path.exists(path):
+        return {"index_type": "flat", "params": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def load_previous(paths):
+    """
+    이전 빌드 결과 (index, meta, info) 로드. 없거나 읽을 수 없으면 None
+    paths: 지금 publish된 snapshot의 파일 경로 (rag.snapshots.current_paths)
+    """
+    has_meta = compact_store_exists(paths["meta_store"]) or os.path.exists(paths["meta_json"])
+    if not (os.path.exists(paths["index"]) and has_meta):
+        return None
+    try:
+        index = faiss.read_index(paths["index"])
+        meta = open_meta_store(paths["meta_store"], paths["meta_json"])
+        info = load_info(paths["info"])
+    except Exception as e:
+        print("[WARN] 이전 빌드 결과를 읽지 못해 전체 빌드로 진행합니다:", e)
+        return None
+    # meta에는 중복 제거된 청크(alias) id도 들어있음 (벡터는 canonical 것만)
+    n_aliases = info.get("dedup", {}).get("aliases", 0)
+    if index.ntotal + n_aliases != len(meta):
+        print("[WARN] 이전 index/meta 개수가 맞지 않아 전체 빌드로 진행합니다.")
+        meta.close()
+        return None
+    return index, meta, info
+
+
+def cli_params(args) -> dict:
+    """명령행에서 직접 준 index 파라미터만 (None은 제외)"""
+    keys = ("nlist", "nprobe", "hnsw_m", "ef_construction", "ef_search", "pq_m", "pq_nbits")
+    params = {k: getattr(args, k) for k in keys if getattr(args, k) is not None}
+    if args.quantize != "none":
+        params["quantize"] = args.quantize
+    return params
+
+
+def diff_chunks(old_meta, ids, hashes):
+    """
+    old_meta(int_id 문자열 -> meta)와 새 청크(ids, hashes) 비교
+    -> (added, updated, removed, unchanged) : added/updated는 새 청크 위치, removed는 int_id
+    """
+    old_hash = {}
+    for key, m in old_meta.items():
+        if int(key) != m.get("int_id", int(key)):
+            continue  # alias id (canonical 레코드를 가리킴, 인덱스에는 없음)
+        old_hash[int(key)] = m.get("text_hash") or text_hash(m.get("text"))
+
+    added, updated, unchanged = [], [], []
+    for pos, (iid, h) in enumerate(zip(ids, hashes)):
+        prev = old_hash.get(int(iid))
+        if prev is None:
+            added.append(pos)
+        elif prev != h:
+            updated.append(pos)
+        else:
+            unchanged.append(pos)
+
+    new_ids = set(map(int, ids))
+    removed = [iid for iid in old_hash if iid not in new_ids]
+    return added, updated, removed, unchanged
+
+
 def main():
+    parser = argparse.ArgumentParser(description="chunks.jsonl -> FAISS index + meta")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="이전 빌드와 비교해서 새로 추가/변경된 청크만 임베딩 (삭제된 청크는 인덱스에서 제거)",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="동시에 보낼 임베딩 요청 수")
+    parser.add_argument(
+        "--batch-tokens", type=int, default=100_000,
+        help="임베딩 요청 1회당 최대 예상 토큰 수",
+    )
+    parser.add_argument(
+        "--checkpoint-dir", default=CKPT_DIR,
+        help="완료된 배치 저장 위치 (중단 후 재실행 시 이어서 진행, 빈 문자열이면 사용 안 함)",
+    )
+    parser.add_argument(
+        "--embed-backend", choices=BACKENDS, default=None,
+        help="임베딩 백엔드 (서비스의 RAG_EMBED_BACKEND와 같아야 함, 기본 RAG_EMBED_BACKEND, "
+             "--incremental에서 안 주면 이전 빌드 값)",
+    )
+    parser.add_argument("--embed-model-path", default=None, help="local 백엔드: 모델 폴더")
+    parser.add_argument("--embed-dim", type=int, default=None, help="hashing 백엔드: 벡터 차원")
+    parser.add_argument(
+        "--truncate-dim", type=int, default=None,
+        help="임베딩 앞쪽 N차원만 저장 (openai는 dimensions 파라미터, 쿼리에도 자동 적용, --incremental에서 안 주면 이전 빌드 값)",
+    )
+    parser.add_argument(
+        "--no-dedup", action="store_true",
+        help="거의 같은 청크도 전부 따로 임베딩/인덱싱 (기본: MinHash로 찾아서 하나만 남기고 나머지는 alias)",
+    )
+    parser.add_argument(
+        "--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+        help="이 이상 단어 3-gram Jaccard가 겹치면 중복으로 봄",
+    )
+    parser.add_argument(
+        "--no-warm", action="store_true",
+        help="빌드 후 예시 질문(rag/sample_questions.json) 답변을 미리 만들지 않음 (앱 시작 시 백그라운드로 생성)",
+    )
+    parser.add_argument(
+        "--json-meta", action="store_true",
+        help="compact meta store와 함께 예전 형식 meta.json도 저장",
+    )
+
+    # --- index type / 파라미터 ---
+    # --incremental에서 안 주면 이전 빌드 값, 아니면 flat
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=None)
+    parser.add_argument("--nlist", type=int, help="IVF: 클러스터 수 (기본 ~4*sqrt(n))")
+    parser.add_argument("--nprobe", type=int, help="IVF: 검색 시 볼 클러스터 수")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW: 노드당 이웃 수")
+    parser.add_argument("--ef-construction", type=int, help="HNSW: 빌드 시 탐색 폭")
+    parser.add_argument("--ef-search", type=int, help="HNSW: 검색 시 탐색 폭")
+    parser.add_argument("--pq-m", type=int, help="IVF-PQ: 서브벡터 수 (dim의 약수)")
+    parser.add_argument("--pq-nbits", type=int, help="IVF-PQ: 서브벡터당 비트 수")
+    parser.add_argument(
+        "--quantize", choices=QUANTIZERS, default=None,
+        help="벡터 저장 방식: sq8(1/4 크기) / fp16(1/2 크기) scalar quantizer (flat/hnsw/ivf_flat, "
+             "기본 none, --incremental에서 안 주면 이전 빌드 값)",
+    )
+    parser.add_argument("--train-size", type=int, default=100_000, help="IVF 학습에 쓸 샘플 벡터 수")
+    parser.add_argument(
+        "--report", action="store_true",
+        help="flat(정확한 검색) 대비 recall@k / latency / index 크기 리포트 (전체 빌드에서만)",
+    )
+    parser.add_argument(
+        "--report-types", default="",
+        help="리포트에서 비교할 타입들 (쉼표 구분, 'all' 가능, 기본: flat + --index-type)",
+    )
+    args = parser.parse_args()
+
+    # 증분 빌드: 명령행에서 안 준 설정은 이전 빌드 값을 그대로 씀
+    # (기본값과 비교해서 "바뀌었다"고 보고 전부 다시 임베딩하지 않도록, 직접 다른 값을 줬을 때만 전체 빌드)
+    _, prev_paths = current_paths()
+    prev = load_previous(prev_paths) if args.incremental else None
+    prev_info = prev[2] if prev is not None else {}
+    if args.index_type is None:
+        args.index_type = prev_info.get("index_type", "flat")
+    if args.quantize is None:
+        args.quantize = prev_info.get("quantize") or prev_info.get("params", {}).get("quantize", "none")
+    if args.truncate_dim is None:
+        args.truncate_dim = prev_info.get("truncate_dim")
+    # 임베딩 모델도 같은 백엔드면 이전 빌드 것 (openai 모델 이름 / hashing 차원)
+    # local은 index_info에 폴더 이름만 있어서 --embed-model-path / RAG_EMBED_MODEL_PATH 그대로
+    embed_model = None
+    if args.embed_backend is None:
+        args.embed_backend = (
+            prev_info.get("embed_backend", "openai") if prev is not None
+            else os.environ.get("RAG_EMBED_BACKEND", "openai")
+        )
+    if prev is not None and args.embed_backend == prev_info.get("embed_backend", "openai"):
+        embed_model = prev_info.get("embed_model", DEFAULT_OPENAI_MODEL if args.embed_backend == "openai" else None)
+        if args.embed_backend == "hashing" and args.embed_dim is None and embed_model:
+            args.embed_dim = int(embed_model.rsplit("-", 1)[-1])
+    if args.quantize != "none" and args.index_type == "ivf_pq":
+        parser.error("ivf_pq는 이미 PQ로 압축된 타입이라 --quantize를 같이 쓸 수 없습니다.")
+
+    embedder = get_embedder(
+        args.embed_backend, model=embed_model if args.embed_backend == "openai" else None,
+        model_path=args.embed_model_path, dim=args.embed_dim, truncate_dim=args.truncate_dim,
+    )
+    pipeline = EmbeddingPipeline(
+        embedder,
+        checkpoint_dir=args.checkpoint_dir or None,
+        max_batch_tokens=args.batch_tokens,
+        # 로컬 모델은 한 프로세스 안에서 배치 추론 → 스레드를 늘려도 이득 없음
+        workers=args.workers if embedder.name == "openai" else 1,
+    )
+
     docs = load_jsonl(DATA_PATH)
     if not docs:
         raise ValueError("chunks.jsonl이 비어있습니다.")
@@ -62,46 +268,220 @@ def main():
         )
 
     texts = [d["text"] for d in docs]
+    hashes = [text_hash(t) for t in texts]
+    ids_np = np.array(ids, dtype=np.int64)
 
-    # --- embeddings (batch) ---
-    vectors = []
-    batch_size = 64
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        resp = client.embeddings.create(model=EMBED_MODEL, input=batch)
-        vectors.extend([x.embedding for x in resp.data])
+    # --- near-duplicate 제거: 먼저 나온 청크(canonical)만 임베딩/인덱싱, 나머지는 alias로 meta에만 ---
+    dup_of = {} if args.no_dedup else find_duplicates(texts, args.dedup_threshold)
+    canon = [pos for pos in range(len(docs)) if pos not in dup_of]
+    aliases_of = {}
+    for pos, c in dup_of.items():
+        aliases_of.setdefault(c, []).append(pos)
 
-    embeddings = np.array(vectors, dtype="float32")
-    faiss.normalize_L2(embeddings)
+    embeddings = None
+    if args.incremental and prev is None:
+        print("[INFO] 이전 빌드 결과가 없어 전체 빌드로 진행합니다.")
+    elif prev is not None and (
+        prev[2].get("index_type", "flat"), prev[2].get("params", {}).get("quantize", "none")
+    ) != (args.index_type, args.quantize):
+        print("[INFO] index type / quantize가 바뀌어서 전체 빌드로 진행합니다.")
+        prev[1].close()
+        prev = None
+    elif prev is not None and (
+        prev[2].get("embed_backend", "openai"), prev[2].get("embed_model", DEFAULT_OPENAI_MODEL),
+        prev[2].get("truncate_dim"),
+    ) != (embedder.name, embedder.model, embedder.truncate_dim):
+        print("[INFO] 임베딩 백엔드/차원이 바뀌어서 전체 빌드로 진행합니다.")
+        prev[1].close()
+        prev = None
+
+    if prev is not None:
+        # --- incremental: 바뀐 청크만 다시 임베딩 ---
+        index, old_meta, old_info = prev
+        params = {**old_info.get("params", {}), **cli_params(args)}
+        added, updated, removed, unchanged = diff_chunks(
+            old_meta, [ids[pos] for pos in canon], [hashes[pos] for pos in canon]
+        )
+        added, updated, unchanged = ([canon[i] for i in x] for x in (added, updated, unchanged))
+
+        stale = removed + [int(ids[pos]) for pos in updated]
+        if stale and not supports_remove(args.index_type):
+            # HNSW는 remove_ids가 안 됨 → 그대로인 벡터만 꺼내서 새 그래프를 만듦 (재임베딩 없음)
+            keep = ids_np[unchanged]
+            dim = index.d
+            kept = [index.reconstruct(int(i)) for i in keep]
+            index = make_index(args.index_type, dim, params)
+            if kept:
+                kept = np.vstack(kept).astype("float32")
+                train_index(index, args.index_type, kept, args.train_size)  # HNSW + sq8
+                index.add_with_ids(kept, keep)
+        elif stale:
+            index.remove_ids(np.array(stale, dtype=np.int64))
+
+        todo = added + updated
+        if todo:
+            embeddings = embed_texts([texts[pos] for pos in todo], pipeline)
+            if embeddings.shape[1] != index.d:
+                raise ValueError(
+                    f"임베딩 차원({embeddings.shape[1]})이 기존 인덱스 차원({index.d})과 다릅니다. "
+                    "--incremental 없이 전체 빌드하세요."
+                )
+            train_index(index, args.index_type, embeddings, args.train_size)  # 이미 학습돼 있으면 그대로
+            index.add_with_ids(embeddings, ids_np[todo])
+    else:
+        # --- full build ---
+        added, updated, removed, unchanged = list(canon), [], [], []
+
+        # --- embeddings (batch) ---
+        embeddings = embed_texts([texts[pos] for pos in canon], pipeline)
+
+        # --- FAISS index with IDs ---
+        dim = embeddings.shape[1]
+        params = {**default_params(args.index_type, len(canon), dim), **cli_params(args)}
+        index = build_and_fill(args.index_type, embeddings, ids_np[canon], params, args.train_size)
+
+    # 새 snapshot 폴더에 씀 (지금 서비스 중인 snapshot 파일은 건드리지 않음 → publish 전까지 아무도 안 읽음)
+    build_id = uuid.uuid4().hex[:12]
+    out = new_snapshot(build_id)
+    faiss.write_index(index, out["index"])
+
+    # 중복 제거로 아낀 것 (중복 없이 전부 넣었을 때 대비): 임베딩 청크/토큰 수, index 크기(벡터당 평균 바이트로 추정)
+    dedup = {
+        "threshold": None if args.no_dedup else args.dedup_threshold,
+        "aliases": len(dup_of),
+        "tokens_saved": sum(pipeline.count_tokens(texts[pos]) for pos in dup_of),
+        "index_bytes_saved": int(os.path.getsize(out["index"]) / max(index.ntotal, 1) * len(dup_of)),
+    }
+
+    # 검색 확장 alias 임베딩 (keywords.json이 바뀐 항목만 다시 임베딩)
+    n_alias_embedded = save_alias_vectors(
+        out["alias"], embedder_key(embedder), load_keywords()["aliases"],
+        lambda batch: embed_texts(batch, pipeline), base=prev_paths["alias"],
+    )
+
+    search_params = {k: params[k] for k in search_param_names(args.index_type) if k in params}
+    write_json(out["info"], {
+        "build_id": build_id,             # 빌드마다 바뀜 (snapshot 버전, 미리 만든 답변이 이 빌드 것인지 확인용)
+        "index_type": args.index_type,
+        "params": params,
+        "search_params": search_params,   # rag_core가 로드 후 적용
+        "dim": int(index.d),
+        "quantize": args.quantize,
+        "ntotal": int(index.ntotal),
+        **embedder_info(embedder),        # rag_core가 로드 시 현재 백엔드와 비교
+        "dedup": dedup,
+    })
+
+    # --- meta: int_id -> metadata (원본 string id도 보존) ---
+    def meta_records():
+        for pos in canon:
+            d, rid, iid, h = docs[pos], raw_ids[pos], ids[pos], hashes[pos]
+            m = {
+                "int_id": int(iid),     # FAISS용
+                "id": rid,              # 원본 문자열 id (who_mh_001)
+                "source": d.get("source"),
+                "title": d.get("title"),
+                "url": d.get("url"),
+                "text": d.get("text"),
+                "text_hash": h,         # 증분 빌드용
+            }
+            m["n_tokens"] = context_tokens(m)  # 프롬프트 Sources 항목 토큰 수 (컨텍스트 예산용)
+            if pos in aliases_of:
+                # 같은 내용의 다른 출처 (alias id로 찾아도 이 레코드가 나옴)
+                m["aliases"] = [
+                    {"id": raw_ids[a], "source": docs[a].get("source"), "title": docs[a].get("title"),
+                     "url": docs[a].get("url")}
+                    for a in aliases_of[pos]
+                ]
+            yield int(iid), m
+
+    alias_ids = [(int(ids[pos]), int(ids[c])) for pos, c in dup_of.items()]
+
+    if prev is not None:
+        prev[1].close()  # 이전 snapshot의 meta mmap은 더 안 씀
+    write_meta_store(out["meta_store"], meta_records(), alias_ids)
+    saved = list(store_paths(out["meta_store"]))
+
+    if args.json_meta:
+        meta_by_intid = {str(iid): m for iid, m in meta_records()}
+        for alias, canonical in alias_ids:
+            meta_by_intid[str(alias)] = meta_by_intid[str(canonical)]
+        with open(out["meta_json"], "w", encoding="utf-8") as f:
+            json.dump(meta_by_intid, f, ensure_ascii=False, indent=2)
+        saved.append(out["meta_json"])
+
+    # 다 썼으면 publish → 서비스가 다음 요청부터 새 snapshot으로 교체, 오래된 snapshot 정리
+    publish(build_id)
+    pruned = prune()
+
+    print(f"✅ indexed {len(canon)} chunks (IDMap string->int64)")
+    if dup_of:
+        print(
+            f"- dedup: {len(dup_of)} near-duplicate chunks -> aliases "
+            f"(embedding {len(dup_of)} chunks / ~{dedup['tokens_saved']:,} tokens, "
+            f"index ~{dedup['index_bytes_saved'] / 1024:,.1f} KB saved)"
+        )
+    print(
+        f"- added: {len(added)}, updated: {len(updated)}, "
+        f"removed: {len(removed)}, unchanged: {len(unchanged)}"
+    )
+    print(f"- index: {args.index_type} {params}")
+    print(f"- embedder: {embedder.name}:{embedder.model} (dim={index.d}, quantize={args.quantize})")
+    print(f"- saved: {out['index']}")
+    print(f"- saved: {out['info']}")
+    print(f"- saved: {out['alias']} (alias 새로 임베딩: {n_alias_embedded})")
+    for p in saved:
+        print(f"- saved: {p}")
+    print(f"- published: {MANIFEST_PATH} (version {build_id})")
+    if pruned:
+        print(f"- removed old snapshots: {', '.join(pruned)}")
+
+    if args.report:
+        if embeddings is None or len(embeddings) != len(canon):
+            print("[WARN] --report는 전체 빌드에서만 지원합니다. (--incremental 없이 실행)")
+        else:
+            run_report(args, embeddings, ids_np[canon])
+
+    # 빌드가 끝까지 성공했으니 체크포인트는 더 이상 필요 없음
+    pipeline.clear_checkpoints()
+
+    if not args.no_warm:
+        warm(embedder)
+
+
+def warm(embedder):
+    """새 index로 예시 질문 검색 결과 + 답변을 미리 생성 (실패해도 빌드는 성공)"""
+    import rag.rag_core as rc
+    from rag import warm_answers
+
+    try:
+        rc.set_engine(rc.RagEngine(embedder=embedder))
+        n = warm_answers.refresh()
+    except Exception as e:
+        print("[WARN] 예시 질문 답변을 미리 만들지 못했습니다 (앱 시작 시 다시 시도):", e)
+        return
+    print(f"- saved: {WARM_PATH} (예시 질문 답변 {n}개)")
+
+
+def run_report(args, embeddings, ids_np):
+    if args.report_types == "all":
+        types = list(INDEX_TYPES)
+    elif args.report_types:
+        types = [t.strip() for t in args.report_types.split(",") if t.strip()]
+    else:
+        types = ["flat"] if args.index_type == "flat" else ["flat", args.index_type]
 
-    # --- FAISS index with IDs ---
     dim = embeddings.shape[1]
-    base = faiss.IndexFlatIP(dim)
-    index = faiss.IndexIDMap2(base)
+    params_by_type = {}
+    for t in types:
+        params_by_type[t] = default_params(t, len(embeddings), dim)
+        if t == args.index_type:
+            params_by_type[t].update(cli_params(args))
 
-    ids_np = np.array(ids, dtype=np.int64)
-    index.add_with_ids(embeddings, ids_np)
-
-    faiss.write_index(index, INDEX_PATH)
-
-    # --- meta: int_id(str) -> metadata (원본 string id도 보존) ---
-    meta_by_intid = {}
-    for d, rid, iid in zip(docs, raw_ids, ids):
-        meta_by_intid[str(int(iid))] = {
-            "int_id": int(iid),     # FAISS용
-            "id": rid,              # 원본 문자열 id (who_mh_001)
-            "source": d.get("source"),
-            "title": d.get("title"),
-            "url": d.get("url"),
-            "text": d.get("text"),
-        }
-
-    with open(META_PATH, "w", encoding="utf-8") as f:
-        json.dump(meta_by_intid, f, ensure_ascii=False, indent=2)
-
-    print(f"✅ indexed {len(docs)} chunks (IDMap string->int64)")
-    print(f"- saved: {INDEX_PATH}")
-    print(f"- saved: {META_PATH}")
+    report = compare_index_types(embeddings, ids_np, types, params_by_type, args.train_size)
+    print_report(report)
+    write_json(REPORT_PATH, report)
+    print(f"- saved: {REPORT_PATH}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+# rag/context_builder.py
+# 검색된 청크 → 프롬프트의 Sources 블록 (토큰 예산 안에서)
+# - 청크별 토큰 수는 build_index가 미리 세서 meta의 "n_tokens"에 저장 (예전 meta면 여기서 셈)
+# - 이미 넣은 청크와 거의 같은 청크(단어 shingle Jaccard >= DUP_THRESHOLD)는 건너뜀
+# - 점수 순서대로 넣다가 예산을 넘는 청크가 나오면 거기서 멈춤
+#   (1등 청크는 예산보다 커도 넣음 → 컨텍스트가 비어서 답을 못 하는 일은 없음)
+# - 중복으로 건너뛴 청크 수 / 예산에서 잘린 횟수는 metrics 카운터 (context_dup_skipped / context_budget_cut),
+#   HIT 로그는 RAG_METRICS=1일 때만
+import os
+import re
+
+from rag.tokens import make_token_counter
+from rag import metrics
+
+# rag_core.CHAT_MODEL과 같은 토크나이저로 셈
+TOKENIZER_MODEL = "gpt-4o-mini"
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+DUP_THRESHOLD = float(os.environ.get("RAG_CONTEXT_DUP_THRESHOLD", "0.8"))
+SHINGLE_SIZE = 3
+
+SEPARATOR = "\n\n"
+SEPARATOR_TOKENS = 1
+
+
+def format_context(m: dict) -> str:
+    """청크 하나의 Sources 항목 (출처 헤더 + URL + 본문)"""
+    chunk_text = (m.get("text") or "").strip()
+    return (
+        f"[{m.get('source','')} | {m.get('title','')}]\n"
+        f"URL: {m.get('url','')}\n"
+        f"CONTENT:\n{chunk_text}"
+    )
+
+
+_count = None
+
+
+def count_tokens(text: str) -> int:
+    global _count
+    if _count is None:
+        _count = make_token_counter(TOKENIZER_MODEL)
+    return _count(text)
+
+
+def context_tokens(m: dict) -> int:
+    """format_context(m)의 토큰 수 (build 때 저장한 값 우선)"""
+    n = m.get("n_tokens")
+    if n is None:
+        n = count_tokens(format_context(m))
+    return int(n)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def build_context(hits, metas, budget: int = None, dup_threshold: float = None):
+    """
+    hits: [(score, int_id), ...] 점수 내림차순, metas: hits와 같은 순서의 meta (없으면 None)
+    -> (context_block, citations, used_tokens)
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    dup_threshold = DUP_THRESHOLD if dup_threshold is None else dup_threshold
+
+    contexts, citations, seen = [], [], []
+    used = 0
+    for (score, cid), m in zip(hits, metas):
+        if not m:
+            continue
+
+        sh = shingles(m.get("text"))
+        if any(jaccard(sh, prev) >= dup_threshold for prev in seen):
+            metrics.incr("context_dup_skipped")
+            continue
+
+        n = context_tokens(m) + (SEPARATOR_TOKENS if contexts else 0)
+        if contexts and used + n > budget:
+            metrics.incr("context_budget_cut")
+            break
+
+        if metrics.enabled():
+            print("HIT:", score, m.get("title"))
+        contexts.append(format_context(m))
+        citations.append({**m, "score": score})
+        seen.append(sh)
+        used += n
+
+    return SEPARATOR.join(contexts), citations, used
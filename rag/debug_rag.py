@@ -1,16 +1,34 @@
 # debug_rag_check.py
+# 실행 (repo 루트에서): python -m rag.debug_rag   (여러 쿼리 일괄 평가는 rag.eval_retrieval)
 import os, json
 import numpy as np
 import faiss
-from openai import OpenAI
 
-INDEX_PATH  = "data/index.faiss"
-META_PATH   = "data/meta.json"
+from rag.embedders import get_embedder, check_compatible
+from rag.meta_store import open_meta_store
+from rag.build_index import str_id_to_int64
+from rag.snapshots import current_paths
+
+# 지금 publish된 snapshot (manifest가 없으면 data/ 바로 아래 예전 경로)
+VERSION, PATHS = current_paths()
+INDEX_PATH  = PATHS["index"]
+META_PATH   = PATHS["meta_json"]  # 예전 형식 (compact store가 없을 때 fallback)
+META_STORE  = PATHS["meta_store"]
+INFO_PATH   = PATHS["info"]
 CHUNKS_PATH = "data/chunks.jsonl"
 
-EMBED_MODEL = "text-embedding-3-small"
 
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+def load_info(path: str = INFO_PATH) -> dict:
+    # index_info.json이 없던 시절의 빌드는 전부 flat / openai
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# rag_core와 같은 백엔드 (RAG_EMBED_BACKEND), 빌드 때 차원을 줄였으면(--truncate-dim) 쿼리도 같은 차원
+INFO = load_info()
+embedder = get_embedder(truncate_dim=INFO.get("truncate_dim"))
 
 
 def load_jsonl(path: str):
@@ -24,10 +42,7 @@ def load_jsonl(path: str):
 
 
 def embed(text: str) -> np.ndarray:
-    resp = client.embeddings.create(model=EMBED_MODEL, input=[text])
-    v = np.array(resp.data[0].embedding, dtype="float32").reshape(1, -1)
-    faiss.normalize_L2(v)
-    return v
+    return embedder.embed([text])
 
 
 def preview_text(t: str, n: int = 220) -> str:
@@ -38,25 +53,29 @@ def preview_text(t: str, n: int = 220) -> str:
 def main():
     # --- load ---
     index = faiss.read_index(INDEX_PATH)
-    with open(META_PATH, "r", encoding="utf-8") as f:
-        meta = json.load(f)
+    meta = open_meta_store(META_STORE, META_PATH)
+    check_compatible(embedder, INFO, index.d)  # RagEngine과 같은 검사 (백엔드/차원이 다르면 RuntimeError)
 
-    chunks = load_jsonl(CHUNKS_PATH)
+    # index의 id는 위치가 아니라 int64 청크 id (build_index의 IDMap) → chunks도 같은 id로 찾음
+    chunks = {int(str_id_to_int64(d["id"])): d for d in load_jsonl(CHUNKS_PATH) if "id" in d}
 
     print("=== FILE CHECK ===")
+    print(f"- version: {VERSION or 'legacy (manifest 없음)'}")
     print(f"- index:  {INDEX_PATH}")
-    print(f"- meta:   {META_PATH} (items={len(meta)})")
+    print(f"- meta:   {META_STORE} / {META_PATH} (items={len(meta)})")
     print(f"- chunks: {CHUNKS_PATH} (items={len(chunks)})")
 
-    # --- sanity: counts ---
-    if len(meta) != len(chunks):
-        print("\n[WARN] meta와 chunks 길이가 다릅니다!")
-        print(" - idx 기반 매칭이면 출처/본문이 엇갈릴 수 있어요.")
+    # --- sanity: ids ---
+    meta_ids = {int(key) for key, _ in meta.items()}
+    missing = set(chunks) - meta_ids
+    if missing or len(meta) != len(chunks):
+        print("\n[WARN] meta와 chunks의 id 구성이 다릅니다!")
+        print(f" - meta에 없는 chunk: {len(missing)}개 → index를 다시 빌드하세요.")
     else:
-        print("\n[OK] meta와 chunks 길이 동일 (idx 기반 매칭 가능)")
+        print("\n[OK] meta와 chunks의 id 구성이 같습니다.")
 
     # --- meta text existence ---
-    meta_has_text = sum(1 for m in meta if isinstance(m, dict) and "text" in m and (m["text"] or "").strip())
+    meta_has_text = sum(1 for _, m in meta.items() if isinstance(m, dict) and (m.get("text") or "").strip())
     print("\n=== META TEXT FIELD ===")
     print(f"- meta에 'text'가 (비어있지 않게) 들어있는 항목 수: {meta_has_text} / {len(meta)}")
 
@@ -65,7 +84,11 @@ def main():
         ntotal = index.ntotal
         print("\n=== INDEX CHECK ===")
         print(f"- index.ntotal = {ntotal}")
-        if ntotal != len(meta):
+        # 빌드 때 중복 제거된 청크(alias)는 meta에만 있고 벡터는 없음
+        n_aliases = sum(1 for key, m in meta.items() if int(key) != m.get("int_id", int(key)))
+        if n_aliases:
+            print(f"- meta alias (중복 제거된 청크) = {n_aliases}")
+        if ntotal != len(meta) - n_aliases:
             print("[WARN] index 벡터 개수(ntotal)와 meta 길이가 다릅니다! (매칭 깨질 가능성)")
     except Exception as e:
         print("\n[WARN] index.ntotal 확인 실패:", e)
@@ -85,7 +108,7 @@ def main():
         if idx == -1:
             continue
 
-        m = meta[idx]
+        m = meta.get_many([int(idx)])[0] or {}
         title = (m.get("title") if isinstance(m, dict) else None) or ""
         src   = (m.get("source") if isinstance(m, dict) else None) or ""
         url   = (m.get("url") if isinstance(m, dict) else None) or ""
@@ -96,11 +119,7 @@ def main():
             meta_text = m.get("text", "") or ""
 
         # chunks.jsonl에서 text 찾기
-        chunk_text = ""
-        try:
-            chunk_text = chunks[idx].get("text", "") or ""
-        except Exception:
-            chunk_text = ""
+        chunk_text = (chunks.get(int(idx)) or {}).get("text", "") or ""
 
         print(f"\n[{rank}] idx={idx} score={float(score):.4f}")
         print(f" - source/title: {src} | {title}")
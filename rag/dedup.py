@@ -0,0 +1,76 @@
+# rag/dedup.py
+# 빌드 시 거의 같은 청크(near-duplicate) 찾기: MinHash + LSH
+# - 청크 본문 → 단어 3-gram shingle (rag/context_builder.py와 같은 방식) → crc32
+# - MinHash 서명 NUM_PERM개를 BANDS개 밴드로 나눠 버킷팅 → 같은 버킷에 걸린 후보만 정확한 Jaccard로 확인
+#   → 전체 쌍 비교(O(n^2)) 없이 거의 선형 시간
+# - chunks.jsonl에서 먼저 나온 청크가 canonical, 뒤의 중복은 canonical의 alias
+#   (canonical끼리만 비교하므로 A≈B≈C 처럼 사슬로 번지지 않음)
+import zlib
+
+import numpy as np
+
+from rag.context_builder import jaccard, shingles
+
+DEDUP_THRESHOLD = 0.85
+NUM_PERM = 64
+BANDS = 16  # 밴드당 4행 → Jaccard 0.5 근처부터 후보로 잡힘 (최종 판정은 정확한 Jaccard)
+
+_PRIME = (1 << 61) - 1
+
+
+def _perm_params(num_perm: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def shingle_hashes(sh: set) -> np.ndarray:
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in sh), dtype=np.uint64, count=len(sh))
+
+
+def minhash(hashes: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(num_perm,) 서명. shingle이 없으면 전부 최대값 (다른 빈 청크와만 같은 버킷)"""
+    if len(hashes) == 0:
+        return np.full(len(a), np.iinfo(np.uint64).max, dtype=np.uint64)
+    # (a*x + b) mod p : crc32(< 2^32) * a 가 uint64를 넘지 않도록 a를 2^32 미만으로 (넘치는 +b는 그냥 wrap)
+    h = (a[:, None] % (1 << 32)) * hashes[None, :] + b[:, None]
+    return (h % _PRIME).min(axis=1)
+
+
+def find_duplicates(texts, threshold: float = DEDUP_THRESHOLD, num_perm: int = NUM_PERM, bands: int = BANDS):
+    """
+    texts (청크 순서) → {중복 위치: canonical 위치}
+    canonical은 항상 더 앞의 위치
+    """
+    rows = num_perm // bands
+    a, b = _perm_params(num_perm)
+    buckets = {}   # (band, 서명 조각) -> [canonical 위치, ...]
+    shingle_sets = {}
+    dup_of = {}
+
+    for pos, text in enumerate(texts):
+        sh = shingles(text)
+        sig = minhash(shingle_hashes(sh), a, b)
+        keys = [(band, sig[band * rows:(band + 1) * rows].tobytes()) for band in range(bands)]
+
+        best, best_j = None, threshold
+        checked = set()
+        for key in keys:
+            for cand in buckets.get(key, ()):
+                if cand in checked:
+                    continue
+                checked.add(cand)
+                j = jaccard(sh, shingle_sets[cand])
+                if j >= best_j:
+                    best, best_j = cand, j
+
+        if best is not None:
+            dup_of[pos] = best
+            continue
+
+        shingle_sets[pos] = sh
+        for key in keys:
+            buckets.setdefault(key, []).append(pos)
+
+    return dup_of
@@ -0,0 +1,189 @@
+# rag/embed_cache.py
+# 쿼리 임베딩 캐시 (메모리 LRU + SQLite 디스크 2단 구조)
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """
+    캐시 키용 정규화
+    - 유니코드 NFC (한글 자모 분리 입력 대비)
+    - 공백 정리 + 소문자
+    """
+    t = unicodedata.normalize("NFC", text or "")
+    return " ".join(t.split()).lower()
+
+
+def cache_key(model: str, text: str) -> str:
+    raw = f"{model}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    (model, 정규화된 쿼리) -> 정규화된 float32 벡터
+
+    - 1단: 프로세스 내 LRU (max_items)
+    - 2단: SQLite 파일 (여러 Streamlit 워커가 공유, max_disk_items 초과 시 오래된 것부터 삭제)
+    - model이 바뀌면 디스크 캐시를 통째로 비움
+    - path가 비어있으면 메모리 캐시만 사용
+    """
+
+    def __init__(self, path: str, model: str, max_items: int = 1024, max_disk_items: int = 100_000):
+        self.path = path
+        self.model = model
+        self.max_items = max_items
+        self.max_disk_items = max_disk_items
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._puts_since_trim = 0
+
+        self.hits_mem = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            try:
+                self._open_db(path)
+            except sqlite3.Error as e:
+                print("[WARN] embedding disk cache 비활성화:", e)
+                self._db = None
+
+    # -------------------------
+    # SQLite
+    # -------------------------
+    def _open_db(self, path: str):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+
+        db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS cache_meta (k TEXT PRIMARY KEY, v TEXT)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, dim INTEGER, vec BLOB, last_used REAL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+
+        # ✅ 모델이 바뀌었으면 예전 벡터는 전부 무효
+        row = db.execute("SELECT v FROM cache_meta WHERE k = 'model'").fetchone()
+        if row is None or row[0] != self.model:
+            db.execute("DELETE FROM embeddings")
+            db.execute("INSERT OR REPLACE INTO cache_meta (k, v) VALUES ('model', ?)", (self.model,))
+        db.commit()
+        self._db = db
+
+    def _disk_get(self, key: str):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT dim, vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        except sqlite3.Error as e:
+            print("[WARN] embedding disk cache read 실패:", e)
+            return None
+        dim, blob = row
+        v = np.frombuffer(blob, dtype="float32")
+        return v if v.shape[0] == dim else None
+
+    def _disk_put(self, key: str, v: np.ndarray):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vec, last_used) VALUES (?, ?, ?, ?)",
+                (key, int(v.shape[0]), v.tobytes(), time.time()),
+            )
+            self._puts_since_trim += 1
+            # 매 put마다 COUNT 하지 않도록 가끔씩만 정리
+            if self._puts_since_trim >= 256:
+                self._trim_disk()
+            self._db.commit()
+        except sqlite3.Error as e:
+            print("[WARN] embedding disk cache write 실패:", e)
+
+    def _trim_disk(self):
+        self._puts_since_trim = 0
+        (n,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        extra = n - self.max_disk_items
+        if extra > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (extra,),
+            )
+            self.evictions += extra
+
+    # -------------------------
+    # LRU
+    # -------------------------
+    def _mem_put(self, key: str, v: np.ndarray):
+        self._lru[key] = v
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    # -------------------------
+    # Public
+    # -------------------------
+    def get(self, text: str):
+        """캐시된 1차원 float32 벡터(읽기 전용) 또는 None"""
+        key = cache_key(self.model, text)
+        with self._lock:
+            v = self._lru.get(key)
+            if v is not None:
+                self._lru.move_to_end(key)
+                self.hits_mem += 1
+                return v
+
+            v = self._disk_get(key)
+            if v is not None:
+                self.hits_disk += 1
+                self._mem_put(key, v)
+                return v
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vec: np.ndarray):
+        v = np.ascontiguousarray(vec, dtype="float32").reshape(-1)
+        v.setflags(write=False)
+        key = cache_key(self.model, text)
+        with self._lock:
+            self._mem_put(key, v)
+            self._disk_put(key, v)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        total = self.hits_mem + self.hits_disk + self.misses
+        return {
+            "model": self.model,
+            "mem_items": len(self._lru),
+            "hits_mem": self.hits_mem,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits_mem + self.hits_disk) / total if total else 0.0,
+        }
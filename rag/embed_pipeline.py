@@ -0,0 +1,203 @@
+# rag/embed_pipeline.py
+# 인덱스 빌드용 임베딩 파이프라인
+# - 배치 크기: 아이템 개수가 아니라 "예상 토큰 수" 기준
+# - 여러 배치를 워커 풀에서 동시에 요청
+# - rate limit 응답이 오면 모든 워커가 함께 쉬었다가(적응형 backoff) 재시도
+# - 끝난 배치는 디스크에 체크포인트 → 중간에 끊겨도 다시 실행하면 이어서 진행
+# - 실제 임베딩은 rag.embedders의 백엔드가 함 (openai / local / hashing)
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import openai
+
+from rag.embedders import embedder_key
+from rag.tokens import make_token_counter
+
+
+# 재시도해볼 만한 오류 (그 외 오류는 바로 실패)
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+def plan_batches(texts, count_tokens, max_batch_tokens: int, max_batch_items: int):
+    """
+    texts를 [start, end) 구간 리스트로 나눔
+    - 구간 합계 토큰 <= max_batch_tokens, 개수 <= max_batch_items
+    - 한 개만으로 한도를 넘는 텍스트는 단독 배치
+    """
+    batches = []
+    start, tokens = 0, 0
+    for i, t in enumerate(texts):
+        n = count_tokens(t)
+        if i > start and (tokens + n > max_batch_tokens or i - start >= max_batch_items):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += n
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+class _Backoff:
+    """
+    워커끼리 공유하는 대기 상태
+    - rate limit을 맞으면 delay를 두 배로 늘리고, 그 시간 동안 모든 워커가 새 요청을 멈춤
+    - 성공하면 delay를 조금씩 줄임
+    """
+
+    def __init__(self, base: float = 1.0, cap: float = 60.0):
+        self.base = base
+        self.cap = cap
+        self.delay = 0.0
+        self.resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        while True:
+            with self._lock:
+                remaining = self.resume_at - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def on_error(self, retry_after: float = None):
+        with self._lock:
+            self.delay = min(self.cap, max(self.base, self.delay * 2))
+            pause = retry_after if retry_after else self.delay * (0.5 + random.random() / 2)
+            self.resume_at = max(self.resume_at, time.monotonic() + pause)
+            return pause
+
+    def on_success(self):
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > self.base else 0.0
+
+
+def _retry_after(e) -> float:
+    resp = getattr(e, "response", None)
+    headers = getattr(resp, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingPipeline:
+    def __init__(
+        self,
+        embedder,
+        checkpoint_dir: str = None,
+        max_batch_tokens: int = 100_000,
+        max_batch_items: int = 2048,
+        workers: int = 4,
+        max_retries: int = 8,
+    ):
+        self.embedder = embedder
+        self.checkpoint_dir = checkpoint_dir
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.workers = workers
+        self.max_retries = max_retries
+        self.count_tokens = make_token_counter(embedder.model)
+        self._backoff = _Backoff()
+
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+
+    # -------------------------
+    # checkpoint
+    # -------------------------
+    def _ckpt_path(self, batch_texts):
+        # 배치 "내용" 기준 키 → 청크 순서/구성이 같으면 다음 실행에서도 같은 파일
+        # 백엔드/모델이 바뀌면 다른 키 → 다른 모델의 벡터를 이어 붙이지 않음
+        h = hashlib.blake2b(embedder_key(self.embedder).encode("utf-8"), digest_size=16)
+        for t in batch_texts:
+            h.update(b"\0")
+            h.update((t or "").encode("utf-8"))
+        return os.path.join(self.checkpoint_dir, f"batch_{h.hexdigest()}.npy")
+
+    def _load_ckpt(self, path, n):
+        try:
+            v = np.load(path)
+        except (OSError, ValueError):
+            return None
+        return v if v.shape[0] == n else None
+
+    def _save_ckpt(self, path, v):
+        tmp = path + ".tmp.npy"
+        np.save(tmp, v)
+        os.replace(tmp, path)  # 반쯤 쓰인 파일이 남지 않도록
+
+    def clear_checkpoints(self):
+        if not self.checkpoint_dir or not os.path.isdir(self.checkpoint_dir):
+            return
+        for name in os.listdir(self.checkpoint_dir):
+            if name.startswith("batch_") and name.endswith(".npy"):
+                os.remove(os.path.join(self.checkpoint_dir, name))
+
+    # -------------------------
+    # embedding
+    # -------------------------
+    def _request(self, batch_texts):
+        for attempt in range(self.max_retries + 1):
+            self._backoff.wait()
+            try:
+                v = self.embedder.embed(batch_texts)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                pause = self._backoff.on_error(_retry_after(e))
+                print(f"[WARN] {type(e).__name__}: {pause:.1f}s 후 재시도 ({attempt + 1}/{self.max_retries})")
+                continue
+            self._backoff.on_success()
+            return np.asarray(v, dtype="float32")
+
+    def _run_batch(self, batch_texts):
+        path = self._ckpt_path(batch_texts) if self.checkpoint_dir else None
+        if path and os.path.exists(path):
+            v = self._load_ckpt(path, len(batch_texts))
+            if v is not None:
+                return v, True
+
+        v = self._request(batch_texts)
+        if path:
+            self._save_ckpt(path, v)
+        return v, False
+
+    def embed(self, texts) -> np.ndarray:
+        """texts -> (n, d) float32, 입력 순서 유지"""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+
+        batches = plan_batches(texts, self.count_tokens, self.max_batch_tokens, self.max_batch_items)
+        results = [None] * len(batches)
+        resumed = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            futures = {
+                pool.submit(self._run_batch, texts[s:e]): bi
+                for bi, (s, e) in enumerate(batches)
+            }
+            try:
+                for done, fut in enumerate(as_completed(futures), start=1):
+                    bi = futures[fut]
+                    results[bi], from_ckpt = fut.result()
+                    resumed += from_ckpt
+                    print(f"[embed] {done}/{len(batches)} batches", end="\r")
+            except BaseException:
+                # 아직 시작 안 한 배치는 취소 (이미 끝난 배치는 체크포인트에 남아 있음)
+                for f in futures:
+                    f.cancel()
+                raise
+
+        print(f"[embed] {len(batches)} batches ({resumed} from checkpoint)")
+        return np.vstack(results)
@@ -0,0 +1,245 @@
+# rag/embedders.py
+# 임베딩 백엔드 (index 빌드 / 쿼리 검색이 같은 인터페이스를 씀)
+#
+# - openai  : OpenAI embeddings API (기본, text-embedding-3-small)
+# - local   : 로컬 경로의 CPU 모델 (sentence-transformers 폴더 또는 model.onnx + tokenizer.json)
+# - hashing : 네트워크/모델 없이 동작하는 결정적 해싱 임베더 (테스트, 벤치마크용)
+#
+# 공통 인터페이스
+#   .name      : 백엔드 이름 ("openai" / "local" / "hashing")
+#   .model     : 모델 이름 (index_info.json에 기록돼서, 로드 시 다른 백엔드면 거부)
+#   .dim       : 벡터 차원 (모르면 None → 첫 embed 후 채워짐)
+#   .truncate_dim : 앞쪽 N차원만 쓰도록 줄였으면 N, 아니면 None (index_info.json에 기록 → 쿼리에도 같게 적용)
+#   .embed(texts) -> (n, dim) float32, L2 정규화됨
+import hashlib
+import os
+import re
+
+import numpy as np
+
+DEFAULT_OPENAI_MODEL = "text-embedding-3-small"
+
+# 요청 없이도 차원을 알 수 있는 OpenAI 모델
+OPENAI_DIMS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    v = np.ascontiguousarray(v, dtype="float32")
+    norms = np.linalg.norm(v, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return v / norms
+
+
+class OpenAIEmbedder:
+    name = "openai"
+
+    def __init__(self, model: str = DEFAULT_OPENAI_MODEL, client=None, truncate_dim: int = None):
+        self.model = model
+        # text-embedding-3-*는 dimensions 파라미터로 앞쪽 N차원(재정규화)만 받을 수 있음 → 응답 크기도 줄어듦
+        self.truncate_dim = truncate_dim
+        self.dim = truncate_dim or OPENAI_DIMS.get(model)
+        self._client = client
+
+    @property
+    def client(self):
+        # openai import / API 키 검사는 실제로 쓸 때
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        return self._client
+
+    def embed(self, texts) -> np.ndarray:
+        kwargs = {"dimensions": self.truncate_dim} if self.truncate_dim else {}
+        resp = self.client.embeddings.create(model=self.model, input=list(texts), **kwargs)
+        v = _normalize(np.array([x.embedding for x in resp.data], dtype="float32"))
+        self.dim = v.shape[1]
+        return v
+
+
+class LocalEmbedder:
+    """
+    로컬 CPU 모델
+    - sentence-transformers가 설치돼 있으면 model_path를 SentenceTransformer로 로드
+    - 아니면 model_path/model.onnx + model_path/tokenizer.json 을 onnxruntime으로 실행 (mean pooling)
+    """
+
+    name = "local"
+    truncate_dim = None
+
+    def __init__(self, model_path: str, batch_size: int = 32, max_length: int = 512):
+        if not os.path.isdir(model_path):
+            raise ValueError(f"로컬 임베딩 모델 경로가 없습니다: {model_path}")
+        self.model_path = model_path
+        # index_info에는 경로 전체 대신 폴더 이름만 기록 (서버마다 경로가 달라도 같은 모델로 인식)
+        self.model = os.path.basename(os.path.normpath(model_path))
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            SentenceTransformer = None
+
+        if SentenceTransformer is not None:
+            self._st = SentenceTransformer(model_path, device="cpu")
+            self.dim = self._st.get_sentence_embedding_dimension()
+        else:
+            self._st = None
+            self._load_onnx()
+
+    def _load_onnx(self):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "local 백엔드에는 sentence-transformers 또는 (onnxruntime + tokenizers)가 필요합니다."
+            ) from e
+
+        self._session = ort.InferenceSession(
+            os.path.join(self.model_path, "model.onnx"), providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = Tokenizer.from_file(os.path.join(self.model_path, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=self.max_length)
+        self._tokenizer.enable_padding()
+        self.dim = None
+        self.dim = self.embed(["dimension probe"]).shape[1]
+
+    def _embed_onnx(self, batch) -> np.ndarray:
+        enc = self._tokenizer.encode_batch(batch)
+        ids = np.array([e.ids for e in enc], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in enc], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        out = self._session.run(None, {k: v for k, v in feeds.items() if k in self._input_names})[0]
+        if out.ndim == 2:  # 이미 pooling된 출력
+            return out
+        m = mask[..., None].astype("float32")
+        return (out * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)
+
+    def embed(self, texts) -> np.ndarray:
+        texts = list(texts)
+        if self._st is not None:
+            v = self._st.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+            return _normalize(v)
+        parts = [self._embed_onnx(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        return _normalize(np.vstack(parts))
+
+
+class HashingEmbedder:
+    """
+    결정적 해싱 임베더 (feature hashing)
+    - 단어 + 글자 bigram을 blake2b로 해싱해서 dim 차원에 +1/-1로 누적
+    - 같은 텍스트 → 항상 같은 벡터, 단어가 겹치면 코사인 유사도도 높음
+    - 의미 검색 품질은 없음: 오프라인 테스트 / 벤치마크 전용
+    """
+
+    name = "hashing"
+    truncate_dim = None
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.model = f"hashing-{dim}"
+
+    def _features(self, text: str):
+        words = re.findall(r"\w+", (text or "").lower())
+        for w in words:
+            yield w
+            for i in range(len(w) - 1):
+                yield w[i:i + 2]
+
+    def embed(self, texts) -> np.ndarray:
+        texts = list(texts)
+        v = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, t in enumerate(texts):
+            for f in self._features(t):
+                h = int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little")
+                v[row, h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return _normalize(v)
+
+
+class TruncatedEmbedder:
+    """
+    다른 백엔드의 벡터에서 앞쪽 truncate_dim차원만 남기고 다시 L2 정규화
+    (OpenAI의 dimensions 파라미터와 같은 방식, local/hashing용)
+    """
+
+    def __init__(self, base, truncate_dim: int):
+        if base.dim is not None and truncate_dim > base.dim:
+            raise ValueError(f"truncate_dim({truncate_dim})이 원래 차원({base.dim})보다 큽니다.")
+        self.base = base
+        self.name = base.name
+        self.model = base.model
+        self.truncate_dim = truncate_dim
+        self.dim = truncate_dim
+
+    def embed(self, texts) -> np.ndarray:
+        return _normalize(self.base.embed(texts)[:, :self.truncate_dim])
+
+
+BACKENDS = ("openai", "local", "hashing")
+
+
+def get_embedder(backend: str = None, model: str = None, model_path: str = None, dim: int = None, client=None,
+                 truncate_dim: int = None):
+    """
+    백엔드 생성 (인자가 없으면 환경변수)
+    - RAG_EMBED_BACKEND    : openai | local | hashing   (기본 openai)
+    - RAG_EMBED_MODEL      : openai 모델 이름
+    - RAG_EMBED_MODEL_PATH : local 모델 폴더
+    - RAG_EMBED_DIM        : hashing 차원
+    truncate_dim은 환경변수가 아니라 build_index 옵션 → index_info.json (rag_core가 읽어서 넘김)
+    """
+    backend = backend or os.environ.get("RAG_EMBED_BACKEND", "openai")
+    if backend == "openai":
+        model = model or os.environ.get("RAG_EMBED_MODEL", DEFAULT_OPENAI_MODEL)
+        return OpenAIEmbedder(model, client=client, truncate_dim=truncate_dim)
+    if backend == "local":
+        path = model_path or os.environ.get("RAG_EMBED_MODEL_PATH", "")
+        embedder = LocalEmbedder(path)
+    elif backend == "hashing":
+        embedder = HashingEmbedder(int(dim or os.environ.get("RAG_EMBED_DIM", "256")))
+    else:
+        raise ValueError(f"알 수 없는 임베딩 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+    return TruncatedEmbedder(embedder, truncate_dim) if truncate_dim else embedder
+
+
+def embedder_key(embedder) -> str:
+    """임베딩 캐시 / 체크포인트 키 (같은 모델이라도 차원을 줄였으면 다른 벡터)"""
+    key = f"{embedder.name}:{embedder.model}"
+    truncate_dim = getattr(embedder, "truncate_dim", None)
+    return f"{key}@{truncate_dim}" if truncate_dim else key
+
+
+def embedder_info(embedder) -> dict:
+    """index_info.json에 기록할 값"""
+    return {
+        "embed_backend": embedder.name,
+        "embed_model": embedder.model,
+        "truncate_dim": getattr(embedder, "truncate_dim", None),
+    }
+
+
+def check_compatible(embedder, info: dict, index_dim: int):
+    """
+    index를 만든 백엔드와 지금 백엔드가 다르면 RuntimeError
+    (백엔드 정보가 없는 예전 index는 openai / text-embedding-3-small 로 간주)
+    """
+    built_backend = info.get("embed_backend", "openai")
+    built_model = info.get("embed_model", DEFAULT_OPENAI_MODEL)
+    if (built_backend, built_model) != (embedder.name, embedder.model):
+        raise RuntimeError(
+            f"index는 {built_backend}:{built_model}로 만들어졌는데 현재 임베딩 백엔드는 "
+            f"{embedder.name}:{embedder.model} 입니다. RAG_EMBED_BACKEND 설정을 맞추거나 index를 다시 빌드하세요."
+        )
+    if embedder.dim is not None and embedder.dim != index_dim:
+        raise RuntimeError(
+            f"임베딩 차원({embedder.dim})이 index 차원({index_dim})과 다릅니다. index를 다시 빌드하세요."
+        )
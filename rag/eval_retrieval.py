@@ -0,0 +1,181 @@
+# rag/eval_retrieval.py
+# 검색 품질 일괄 평가 (비대화형)
+# - 입력: JSONL 한 줄에 {"query": "...", "expected_ids": ["nimh_dep_001", ...]} (chunks.jsonl의 문자열 id)
+# - 쿼리는 embed_many로 한꺼번에 임베딩, 서비스와 같은 방식으로 alias 벡터 확장 후 FAISS search 한 번
+# - 리포트: recall@k, MRR, MIN_SCORE 컷 효과(컷 후 recall / 결과 0개 비율), 쿼리당 검색 latency
+# threshold / alias / index type을 바꾼 뒤 같은 파일로 다시 돌려서 비교하는 용도
+# 실행 (repo 루트에서):
+#   python -m rag.eval_retrieval data/eval_queries.jsonl [--ks 1,3,5,10] [--thresholds 0,0.05,0.08,0.15,0.3]
+#                                 [--no-expand] [--out data/eval_report.json]
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import rag.rag_core as rc
+from rag.build_index import load_jsonl, str_id_to_int64
+from rag.keyword_matcher import match_keywords
+
+
+def load_eval_set(path: str):
+    rows = []
+    for i, r in enumerate(load_jsonl(path), start=1):
+        if not r.get("query") or not r.get("expected_ids"):
+            raise ValueError(f"{path}:{i} query / expected_ids가 필요합니다.")
+        rows.append({"query": r["query"], "expected_ids": [str(x) for x in r["expected_ids"]]})
+    return rows
+
+
+def first_relevant_rank(hit_ids, expected: set):
+    """1부터 세는 순위, 없으면 None"""
+    for rank, cid in enumerate(hit_ids, start=1):
+        if cid in expected:
+            return rank
+    return None
+
+
+def recall_at(hit_ids, expected: set, k: int) -> float:
+    return len(expected & set(hit_ids[:k])) / len(expected)
+
+
+def evaluate(rows, ks, thresholds, expand: bool = True, k_answer: int = 4):
+    k_max = max(max(ks), rc.search_k(k_answer))
+
+    # --- 임베딩 (한 번에, 원문 쿼리) → alias 확장은 서비스처럼 벡터 공간에서 ---
+    t0 = time.perf_counter()
+    qmat = rc.embed_many([r["query"] for r in rows])
+    if expand:
+        qmat = np.vstack([
+            rc.expand_vector(qmat[i:i + 1], match_keywords(r["query"])) for i, r in enumerate(rows)
+        ])
+    embed_s = time.perf_counter() - t0
+
+    # --- 검색 (한 번에) ---
+    t0 = time.perf_counter()
+    all_hits = rc.search_many(qmat, k_max)
+    search_s = time.perf_counter() - t0
+
+    # --- 쿼리당 검색 latency (한 개씩 따로) ---
+    lat = []
+    for i in range(len(qmat)):
+        t0 = time.perf_counter()
+        rc.search_many(qmat[i:i + 1], k_max)
+        lat.append((time.perf_counter() - t0) * 1000)
+
+    per_query = []
+    for r, hits in zip(rows, all_hits):
+        expected = {int(str_id_to_int64(x)) for x in r["expected_ids"]}
+        hit_ids = [cid for _, cid in hits]
+        rank = first_relevant_rank(hit_ids, expected)
+        top = hits[:max(ks)]
+        metas = rc.get_engine().meta.get_many([cid for _, cid in top])
+        per_query.append({
+            "query": r["query"],
+            "expected_ids": r["expected_ids"],
+            "gated": not rc.is_mental_health_query(r["query"], match_keywords(r["query"])),
+            "first_relevant_rank": rank,
+            "top": [{"id": (m or {}).get("id"), "score": score} for (score, _), m in zip(top, metas)],
+            "_expected": expected,
+            "_hits": hits,
+        })
+
+    n = len(per_query)
+    summary = {
+        "n_queries": n,
+        "expand": expand,
+        "recall": {
+            f"@{k}": sum(recall_at([c for _, c in q["_hits"]], q["_expected"], k) for q in per_query) / n
+            for k in ks
+        },
+        "mrr": sum(1.0 / q["first_relevant_rank"] for q in per_query if q["first_relevant_rank"]) / n,
+        "gate_rejected": sum(q["gated"] for q in per_query),
+    }
+
+    # --- MIN_SCORE 컷 효과: answer()처럼 search_k개 → 컷 → 상위 k_answer개 ---
+    cut = {}
+    for th in sorted(set(thresholds) | {rc.MIN_SCORE}):
+        rec, empty, kept = 0.0, 0, 0
+        for q in per_query:
+            ids = [c for s, c in q["_hits"][:rc.search_k(k_answer)] if s >= th][:k_answer]
+            rec += recall_at(ids, q["_expected"], k_answer)
+            empty += not ids
+            kept += len(ids)
+        cut[f"{th:g}"] = {
+            f"recall@{k_answer}": rec / n,
+            "no_hits_rate": empty / n,
+            "avg_kept": kept / n,
+        }
+    summary["min_score"] = {"current": rc.MIN_SCORE, "k": k_answer, "sweep": cut}
+
+    lat = np.array(lat)
+    summary["latency"] = {
+        "embed_total_seconds": embed_s,
+        "search_batch_seconds": search_s,
+        "search_ms_p50": float(np.percentile(lat, 50)),
+        "search_ms_p95": float(np.percentile(lat, 95)),
+        "search_ms_max": float(lat.max()),
+    }
+
+    for q in per_query:
+        del q["_expected"], q["_hits"]
+    return summary, per_query
+
+
+def print_summary(summary, per_query):
+    print(f"=== retrieval eval (n={summary['n_queries']}, alias expand={summary['expand']}) ===")
+    for k, v in summary["recall"].items():
+        print(f"- recall{k}: {v:.4f}")
+    print(f"- MRR: {summary['mrr']:.4f}")
+    if summary["gate_rejected"]:
+        print(f"- [WARN] 키워드 게이트에서 막히는 쿼리: {summary['gate_rejected']}개 (서비스에서는 NO_INFO)")
+
+    ms = summary["min_score"]
+    print(f"\n=== MIN_SCORE 컷 (현재 {ms['current']:g}, top-{ms['k']}) ===")
+    print(f"{'threshold':>10s} {'recall@' + str(ms['k']):>10s} {'no hits':>9s} {'avg kept':>9s}")
+    for th, r in ms["sweep"].items():
+        print(f"{th:>10s} {r['recall@' + str(ms['k'])]:10.4f} {r['no_hits_rate']:9.2%} {r['avg_kept']:9.2f}")
+
+    lat = summary["latency"]
+    print(
+        f"\n=== latency ===\n- embed (batch, 전체): {lat['embed_total_seconds'] * 1000:.1f} ms"
+        f"\n- search (batch, 전체): {lat['search_batch_seconds'] * 1000:.2f} ms"
+        f"\n- search (쿼리당): p50 {lat['search_ms_p50']:.3f} ms, p95 {lat['search_ms_p95']:.3f} ms"
+    )
+
+    misses = [q for q in per_query if q["first_relevant_rank"] is None]
+    if misses:
+        print(f"\n=== 정답을 못 찾은 쿼리 ({len(misses)}) ===")
+        for q in misses:
+            print(f"- {q['query']}  (expected: {', '.join(q['expected_ids'])})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="batch retrieval-quality evaluation")
+    parser.add_argument("eval_file", help="JSONL: {\"query\": ..., \"expected_ids\": [...]}")
+    parser.add_argument("--ks", default="1,3,5,10", help="recall@k의 k들 (쉼표 구분)")
+    parser.add_argument("--thresholds", default="0,0.05,0.08,0.15,0.2,0.3", help="MIN_SCORE 후보들")
+    parser.add_argument("--k", type=int, default=4, help="answer()의 k (컷 효과 계산용)")
+    parser.add_argument("--no-expand", action="store_true", help="alias 확장 없이 원문 쿼리로 검색")
+    parser.add_argument("--out", default="", help="쿼리별 결과까지 포함한 JSON 저장 경로")
+    args = parser.parse_args()
+
+    rows = load_eval_set(args.eval_file)
+    if not rows:
+        raise ValueError("평가 파일이 비어있습니다.")
+    ks = [int(x) for x in args.ks.split(",")]
+    thresholds = [float(x) for x in args.thresholds.split(",")]
+
+    summary, per_query = evaluate(rows, ks, thresholds, expand=not args.no_expand, k_answer=args.k)
+    print_summary(summary, per_query)
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "queries": per_query}, f, ensure_ascii=False, indent=2)
+        print(f"- saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# rag/index_types.py
+# build_index에서 고를 수 있는 FAISS index 종류 + 검색 파라미터 + recall/latency 리포트
+#
+# - flat     : IndexFlatIP (정확한 brute-force, 기본값)
+# - hnsw     : HNSW 그래프 (학습 불필요, 빠름, 삭제(remove_ids) 불가 → 증분 빌드 시 변경/삭제가 있으면 전체 빌드)
+# - ivf_flat : IVF + 원본 벡터 (학습 필요, nprobe로 속도/정확도 조절)
+# - ivf_pq   : IVF + PQ 압축 (학습 필요, 메모리 가장 작음, 정확도 손실 있음)
+#
+# flat / hnsw / ivf_flat은 벡터 저장 방식을 scalar quantizer로 바꿀 수 있음 (params["quantize"])
+# - sq8  : 차원마다 8bit (float32 대비 1/4, 값 범위를 학습해야 함)
+# - fp16 : 차원마다 16bit (1/2, 학습 불필요, 손실 거의 없음)
+#
+# 전부 IndexIDMap2로 감싸서 build_index의 int64 id(str_id_to_int64)를 그대로 씀
+import math
+import time
+
+import numpy as np
+import faiss
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+QUANTIZERS = ("none", "sq8", "fp16")
+_SQ_CODES = {"sq8": "SQ8", "fp16": "SQfp16"}
+
+
+def default_params(index_type: str, n: int, dim: int) -> dict:
+    """코퍼스 크기(n)에 맞춘 기본 파라미터 (build/search 둘 다)"""
+    if index_type == "hnsw":
+        return {"hnsw_m": 32, "ef_construction": 80, "ef_search": 64}
+    if index_type in ("ivf_flat", "ivf_pq"):
+        # nlist ~ 4*sqrt(n), 단 centroid당 학습 벡터가 최소 39개는 되도록
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39 or 1))
+        params = {"nlist": nlist, "nprobe": max(1, min(nlist // 8 or 1, 64))}
+        if index_type == "ivf_pq":
+            # pq_m은 dim의 약수여야 함 (서브벡터 하나당 약 16차원)
+            pq_m = max(m for m in range(1, min(dim, 64) + 1) if dim % m == 0 and dim // m >= 16) \
+                if dim >= 16 else dim
+            # 코드북 하나(2^nbits)를 학습할 벡터가 부족하면 nbits를 줄임
+            nbits = max(1, min(8, int(math.log2(max(2, n // 39)))))
+            params.update({"pq_m": pq_m, "pq_nbits": nbits})
+        return params
+    return {}
+
+
+def search_param_names(index_type: str):
+    if index_type == "hnsw":
+        return ("ef_search",)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return ("nprobe",)
+    return ()
+
+
+def supports_remove(index_type: str) -> bool:
+    return index_type != "hnsw"
+
+
+def factory_string(index_type: str, params: dict) -> str:
+    quantize = params.get("quantize") or "none"
+    if quantize not in QUANTIZERS:
+        raise ValueError(f"알 수 없는 quantize: {quantize} (가능: {', '.join(QUANTIZERS)})")
+    sq = _SQ_CODES.get(quantize)
+    if index_type == "flat":
+        return f"IDMap2,{sq}" if sq else "IDMap2,Flat"
+    if index_type == "hnsw":
+        return f"IDMap2,HNSW{params['hnsw_m']}" + (f"_{sq}" if sq else "")
+    if index_type == "ivf_flat":
+        return f"IDMap2,IVF{params['nlist']},{sq or 'Flat'}"
+    if index_type == "ivf_pq":
+        if sq:
+            raise ValueError("ivf_pq는 이미 PQ로 압축된 타입이라 quantize를 같이 쓸 수 없습니다.")
+        return f"IDMap2,IVF{params['nlist']},PQ{params['pq_m']}x{params['pq_nbits']}"
+    raise ValueError(f"알 수 없는 index type: {index_type} (가능: {', '.join(INDEX_TYPES)})")
+
+
+def make_index(index_type: str, dim: int, params: dict):
+    """빈 IndexIDMap2(...) 생성 (metric = inner product, 벡터는 L2 정규화 전제)"""
+    index = faiss.index_factory(dim, factory_string(index_type, params), faiss.METRIC_INNER_PRODUCT)
+    if index_type == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efConstruction = params["ef_construction"]
+    return index
+
+
+def train_index(index, index_type: str, vectors: np.ndarray, train_size: int, seed: int = 0):
+    """학습이 필요한 index(IVF, PQ, sq8)면 vectors 중 train_size개를 무작위 샘플링해서 학습"""
+    if index.is_trained:
+        return
+    if len(vectors) > train_size:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), train_size, replace=False)]
+    else:
+        sample = vectors
+    index.train(np.ascontiguousarray(sample, dtype="float32"))
+
+
+def apply_search_params(index, search_params: dict):
+    """
+    검색 파라미터 적용 (IndexIDMap2를 통과해서 안쪽 index에 설정됨)
+    - ef_search → efSearch, nprobe → nprobe
+    """
+    if not search_params:
+        return
+    names = {"ef_search": "efSearch", "nprobe": "nprobe"}
+    ps = faiss.ParameterSpace()
+    for key, value in search_params.items():
+        ps.set_index_parameter(index, names.get(key, key), value)
+
+
+def build_and_fill(index_type, vectors, ids, params, train_size):
+    index = make_index(index_type, vectors.shape[1], params)
+    train_index(index, index_type, vectors, train_size)
+    index.add_with_ids(vectors, ids)
+    apply_search_params(index, {k: params[k] for k in search_param_names(index_type) if k in params})
+    return index
+
+
+# =========================
+# recall / latency report
+# =========================
+def make_queries(vectors: np.ndarray, n_queries: int, noise: float = 0.5, seed: int = 0):
+    """
+    코퍼스 벡터에 노이즈를 섞은 가짜 쿼리 (청크 그 자체를 그대로 쓰면 자기 자신이 항상 1등이라 recall이 부풀려짐)
+    """
+    rng = np.random.default_rng(seed)
+    pick = rng.choice(len(vectors), min(n_queries, len(vectors)), replace=False)
+    q = vectors[pick].copy()
+    q += rng.standard_normal(q.shape).astype("float32") * (noise / math.sqrt(q.shape[1]))
+    faiss.normalize_L2(q)
+    return q
+
+
+def _latencies_ms(index, queries, k):
+    out = []
+    for i in range(len(queries)):
+        t0 = time.perf_counter()
+        index.search(queries[i:i + 1], k)
+        out.append((time.perf_counter() - t0) * 1000)
+    return np.array(out)
+
+
+def evaluate_index(index, exact_ids: np.ndarray, queries: np.ndarray, k: int) -> dict:
+    """exact_ids: 정확한(flat) 검색의 top-k id (len(queries), k)"""
+    _, ids = index.search(queries, k)
+    hit = 0
+    for got, want in zip(ids, exact_ids):
+        want_set = set(int(x) for x in want if x != -1)
+        hit += len(want_set & set(int(x) for x in got if x != -1)) / max(1, len(want_set))
+    lat = _latencies_ms(index, queries, k)
+    return {
+        f"recall@{k}": hit / max(1, len(queries)),
+        "latency_ms_p50": float(np.percentile(lat, 50)),
+        "latency_ms_p95": float(np.percentile(lat, 95)),
+        "index_bytes": int(faiss.serialize_index(index).size),
+    }
+
+
+def compare_index_types(vectors, ids, index_types, params_by_type, train_size, k=10, n_queries=200):
+    """같은 벡터로 여러 index 타입을 만들어 flat(정확한 검색) 대비 recall@k / latency / 크기 비교"""
+    queries = make_queries(vectors, n_queries)
+    k = min(k, len(vectors))
+
+    exact = build_and_fill("flat", vectors, ids, {}, train_size)
+    _, exact_ids = exact.search(queries, k)
+
+    report = {"n_vectors": int(len(vectors)), "dim": int(vectors.shape[1]), "n_queries": int(len(queries)), "k": k}
+    results = {}
+    for t in index_types:
+        params = params_by_type[t]
+        t0 = time.perf_counter()
+        reuse = t == "flat" and not params.get("quantize")
+        index = exact if reuse else build_and_fill(t, vectors, ids, params, train_size)
+        build_s = 0.0 if reuse else time.perf_counter() - t0
+        results[t] = {"params": params, "build_seconds": build_s, **evaluate_index(index, exact_ids, queries, k)}
+    report["results"] = results
+    return report
+
+
+def print_report(report: dict):
+    k = report["k"]
+    print(f"=== index report (n={report['n_vectors']}, dim={report['dim']}, queries={report['n_queries']}) ===")
+    print(f"{'type':10s} {'recall@' + str(k):>10s} {'p50 ms':>9s} {'p95 ms':>9s} {'size MB':>9s} {'build s':>9s}")
+    for t, r in report["results"].items():
+        print(
+            f"{t:10s} {r[f'recall@{k}']:10.4f} {r['latency_ms_p50']:9.3f} {r['latency_ms_p95']:9.3f} "
+            f"{r['index_bytes'] / 2**20:9.2f} {r['build_seconds']:9.2f}"
+        )
@@ -0,0 +1,275 @@
+# rag/ingest.py
+# 원본 문서(OG data file/*.txt) → data/chunks.jsonl
+# - 파일을 한 줄씩 읽는 제너레이터 → 문단 → 문장 → 토큰 수 기준 청크 (앞 청크와 overlap)
+#   → 파일 크기와 상관없이 메모리에는 청크 하나 분량만
+# - "### Chunk 3: ..." 같은 markdown 제목 줄은 섹션 경계 (섹션을 넘어서 overlap 하지 않음)
+# - 파일별 source / title / url / id 접두사는 rag/sources.json (없으면 파일 이름에서 추정)
+# - id = <접두사>_<파일 안 순번 3자리> (예: nimh_dep_001) → data/chunks.jsonl / eval_queries.jsonl의 id와 같은 형식
+#   (앞쪽 청크가 늘거나 줄면 뒤 id가 밀려서 build_index --incremental이 그 뒤 청크를 다시 임베딩)
+# - 메모리에 안 올리는 건 ingest까지만: --build로 이어서 도는 build_index는 chunks.jsonl을 한 번에 읽음
+# - 파일은 여러 프로세스에서 동시에 처리하고, 각자 임시 파일에 쓴 뒤 파일 이름 순서대로 이어 붙임
+# 실행 (repo 루트에서):
+#   python -m rag.ingest                                   # OG data file → data/chunks.jsonl
+#   python -m rag.ingest --build -- --incremental          # 끝나면 build_index까지 (-- 뒤는 build_index 인자)
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+from multiprocessing import Pool
+
+from rag.tokens import make_token_counter
+
+RAW_DIR = "OG data file"
+OUT_PATH = "data/chunks.jsonl"
+SOURCES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sources.json")
+
+# 임베딩 모델 토크나이저 기준
+TOKEN_MODEL = "text-embedding-3-small"
+CHUNK_TOKENS = 300
+OVERLAP_TOKENS = 50
+
+_HEADING = re.compile(r"^#{1,6}\s*(?:chunk\s*\d+\s*:\s*)?(.*)$", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?。])\s+")
+_TERMINAL = (".", "!", "?", "。", ":", ";")
+
+
+def load_sources(path: str = SOURCES_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {k: v for k, v in json.load(f).items() if not k.startswith("_")}
+
+
+def source_info(filename: str, sources: dict) -> dict:
+    """sources.json 항목, 없으면 파일 이름(예: depression_nimh.txt)에서 추정"""
+    if filename in sources:
+        return sources[filename]
+    stem = os.path.splitext(filename)[0]
+    parts = stem.split("_")
+    source = parts[-1].upper() if len(parts) > 1 else ""
+    name = " ".join(parts[:-1] if source else parts)
+    return {
+        "source": source,
+        "title": name[:1].upper() + name[1:],
+        "url": "",
+        "id_prefix": re.sub(r"[^0-9a-z]+", "_", stem.lower()).strip("_"),
+    }
+
+
+# =========================
+# streaming: lines → blocks → sentences
+# =========================
+def iter_blocks(path: str):
+    """("section", 제목) 또는 ("para", [줄, ...]) 를 순서대로"""
+    buf = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for raw in f:
+            line = raw.strip()
+            if line.startswith("#"):
+                if buf:
+                    yield "para", buf
+                    buf = []
+                yield "section", _HEADING.match(line).group(1).strip()
+            elif not line:
+                if buf:
+                    yield "para", buf
+                    buf = []
+            else:
+                buf.append(line)
+    if buf:
+        yield "para", buf
+
+
+def split_sentences(text: str, count, max_tokens: int):
+    """문장 단위 (한 문장이 max_tokens보다 길면 단어 단위로 자름) → (문장, 토큰 수)"""
+    for sent in _SENTENCE_END.split(text):
+        sent = sent.strip()
+        if not sent:
+            continue
+        n = count(sent)
+        if n <= max_tokens:
+            yield sent, n
+            continue
+        words, piece, piece_n = sent.split(), [], 0
+        for w in words:
+            wn = count(w + " ")
+            if piece and piece_n + wn > max_tokens:
+                yield " ".join(piece), piece_n
+                piece, piece_n = [], 0
+            piece.append(w)
+            piece_n += wn
+        if piece:
+            yield " ".join(piece), piece_n
+
+
+# =========================
+# chunking
+# =========================
+def _section_title(doc_title: str, section: str) -> str:
+    if not section:
+        return f"{doc_title} — Overview"
+    section = section.replace(" – ", " — ").replace(" - ", " — ")
+    if section.lower().startswith(doc_title.lower()):
+        return section
+    return f"{doc_title} — {section}"
+
+
+def chunk_file(path: str, info: dict, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = OVERLAP_TOKENS):
+    """파일 하나 → 청크 dict 제너레이터 (chunks.jsonl 스키마)"""
+    count = make_token_counter(TOKEN_MODEL)
+    doc_title = info.get("title") or os.path.splitext(os.path.basename(path))[0]
+
+    section = None
+    expect_heading = False
+    part = 0
+    window = []   # [(문장, 토큰 수, 문단 시작 여부)]
+    tokens = 0
+    fresh = 0     # window 중 아직 어떤 청크에도 안 들어간 문장 수
+
+    def emit():
+        nonlocal part
+        part += 1
+        text = ""
+        for i, (sent, _, para_start) in enumerate(window):
+            text += sent if i == 0 else ("\n\n" if para_start else " ") + sent
+        title = _section_title(doc_title, section)
+        if part > 1:
+            title += f" ({part})"
+        return {"source": info.get("source", ""), "title": title, "url": info.get("url", ""), "text": text}
+
+    def carry_overlap():
+        # 마지막 문장들 중 overlap_tokens 안에 들어가는 만큼만 다음 청크 앞에 남김
+        keep, n = [], 0
+        for item in reversed(window):
+            if n + item[1] > overlap_tokens:
+                break
+            keep.insert(0, item)
+            n += item[1]
+        return keep, n
+
+    for kind, value in iter_blocks(path):
+        if kind == "section":
+            if fresh:
+                yield emit()
+            section, expect_heading, part = value, True, 0
+            window, tokens, fresh = [], 0, 0
+            continue
+
+        lines = value
+        # 섹션 표시 바로 다음 줄이 문장이 아닌 제목이면 (예: "Mental health – Key facts") 제목으로 사용
+        if expect_heading and len(lines) > 1 and not lines[0].endswith(_TERMINAL):
+            section, lines = lines[0], lines[1:]
+        expect_heading = False
+
+        for i, (sent, n) in enumerate(split_sentences(" ".join(lines), count, chunk_tokens)):
+            if fresh and tokens + n > chunk_tokens:
+                yield emit()
+                window, tokens = carry_overlap()
+                fresh = 0
+            while window and not fresh and tokens + n > chunk_tokens:
+                tokens -= window.pop(0)[1]  # overlap을 줄여서라도 청크 크기는 지킴
+            window.append((sent, n, i == 0))
+            tokens += n
+            fresh += 1
+
+    if fresh:
+        yield emit()
+
+
+def chunk_id(prefix: str, n: int) -> str:
+    return f"{prefix}_{n:03d}"
+
+
+def ingest_file(job):
+    """worker: 파일 하나를 청크로 나눠 part 파일에 씀 → (파일 이름, part 경로, id 목록)"""
+    path, info, part_path, chunk_tokens, overlap_tokens = job
+    ids = []
+    with open(part_path, "w", encoding="utf-8") as out:
+        for n, chunk in enumerate(chunk_file(path, info, chunk_tokens, overlap_tokens), start=1):
+            cid = chunk_id(info["id_prefix"], n)
+            ids.append(cid)
+            out.write(json.dumps({"id": cid, **chunk}, ensure_ascii=False) + "\n")
+    return os.path.basename(path), part_path, ids
+
+
+def ingest(raw_dir: str, out_path: str, chunk_tokens: int, overlap_tokens: int, workers: int):
+    files = sorted(glob.glob(os.path.join(raw_dir, "*.txt")))
+    if not files:
+        raise ValueError(f"{raw_dir}에 .txt 파일이 없습니다.")
+    sources = load_sources()
+
+    out_dir = os.path.dirname(out_path) or "."
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix="ingest_", dir=out_dir)
+    jobs = [
+        (p, source_info(os.path.basename(p), sources), os.path.join(tmp_dir, f"{i:06d}.jsonl"),
+         chunk_tokens, overlap_tokens)
+        for i, p in enumerate(files)
+    ]
+
+    all_ids = set()
+    total = 0
+    tmp_out = out_path + ".tmp"
+    try:
+        with open(tmp_out, "wb") as out:
+            workers = max(1, min(workers, len(jobs)))
+            pool = Pool(workers) if workers > 1 else None
+            try:
+                results = pool.imap(ingest_file, jobs) if pool else map(ingest_file, jobs)
+                # imap은 입력 순서대로 돌려줌 → 끝난 파일부터 바로 이어 붙임 (출력 순서는 항상 같음)
+                for name, part_path, ids in results:
+                    dup = all_ids.intersection(ids)
+                    if dup:
+                        raise ValueError(f"{name}: 다른 파일과 id가 겹칩니다 ({sorted(dup)[:3]}). sources.json의 id_prefix를 확인하세요.")
+                    all_ids.update(ids)
+                    total += len(ids)
+                    with open(part_path, "rb") as part:
+                        shutil.copyfileobj(part, out)
+                    os.remove(part_path)
+                    print(f"[ingest] {name}: {len(ids)} chunks")
+            finally:
+                if pool:
+                    pool.close()
+                    pool.join()
+        os.replace(tmp_out, out_path)
+    finally:
+        if os.path.exists(tmp_out):
+            os.remove(tmp_out)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return len(files), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="raw .txt documents -> chunks.jsonl")
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--out", default=OUT_PATH)
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS, help="청크당 최대 토큰 수")
+    parser.add_argument("--overlap-tokens", type=int, default=OVERLAP_TOKENS, help="앞 청크와 겹치는 토큰 수")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="동시에 처리할 파일 수 (프로세스)")
+    parser.add_argument("--build", action="store_true", help="끝나면 build_index 실행 (-- 뒤의 인자를 그대로 넘김)")
+    args, rest = parser.parse_known_args()
+    if rest and rest[0] == "--":
+        rest = rest[1:]
+    if rest and not args.build:
+        parser.error(f"알 수 없는 인자: {' '.join(rest)}")
+    if args.overlap_tokens >= args.chunk_tokens:
+        parser.error("--overlap-tokens는 --chunk-tokens보다 작아야 합니다.")
+
+    n_files, n_chunks = ingest(args.raw_dir, args.out, args.chunk_tokens, args.overlap_tokens, args.workers)
+    print(f"✅ ingested {n_files} files -> {n_chunks} chunks")
+    print(f"- saved: {args.out}")
+
+    if args.build:
+        from rag import build_index
+
+        build_index.DATA_PATH = args.out
+        sys.argv = ["build_index", *rest]
+        build_index.main()
+
+
+if __name__ == "__main__":
+    main()
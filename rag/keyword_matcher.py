@@ -0,0 +1,123 @@
+# rag/keyword_matcher.py
+# 키워드 게이트(위기 문구 / 정신건강 주제 / 검색 확장 alias)를 한 번의 스캔으로 처리
+# - 키워드 표는 rag/keywords.json 한 곳에서 관리 (crisis, topic, aliases)
+# - 로드 시 Aho-Corasick 오토마톤을 한 번만 만들어 두고,
+#   소문자로 바꾼 텍스트를 한 번 훑으면서 세 종류의 매치를 모두 찾음
+#   → 키워드가 수천 개로 늘어나도 질문 길이에만 비례
+import json
+import os
+import threading
+from collections import namedtuple
+
+KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "keywords.json")
+
+# crisis/topics: 매치된 키워드, aliases: 매치된 alias 키 (keywords.json 순서)
+KeywordMatches = namedtuple("KeywordMatches", ["crisis", "topics", "aliases"])
+
+
+def load_keywords(path: str = KEYWORDS_PATH) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    return {
+        "crisis": [k.lower() for k in cfg.get("crisis", [])],
+        "topic": [k.lower() for k in cfg.get("topic", [])],
+        "aliases": {k.lower(): v for k, v in cfg.get("aliases", {}).items()},
+    }
+
+
+class _AhoCorasick:
+    """Aho-Corasick (goto / fail / output 테이블)"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def add(self, pattern: str, value):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].append(value)
+
+    def build(self):
+        # BFS로 fail 링크 연결 + 접미사 상태의 output 합치기
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                if state == 0:
+                    self._fail[nxt] = 0  # 루트의 자식은 루트로
+                else:
+                    f = self._fail[state]
+                    while f and ch not in self._goto[f]:
+                        f = self._fail[f]
+                    self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_values(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                yield from out[state]
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: dict):
+        self.keywords = keywords
+        self._alias_order = {k: i for i, k in enumerate(keywords["aliases"])}
+
+        ac = _AhoCorasick()
+        for k in keywords["crisis"]:
+            ac.add(k, ("crisis", k))
+        for k in keywords["topic"]:
+            ac.add(k, ("topic", k))
+        for k in keywords["aliases"]:
+            ac.add(k, ("alias", k))
+        ac.build()
+        self._ac = ac
+
+    def match(self, text: str) -> KeywordMatches:
+        crisis, topics, aliases = set(), set(), set()
+        buckets = {"crisis": crisis, "topic": topics, "alias": aliases}
+        for kind, k in self._ac.iter_values((text or "").lower()):
+            buckets[kind].add(k)
+        return KeywordMatches(
+            crisis=sorted(crisis),
+            topics=sorted(topics),
+            aliases=sorted(aliases, key=self._alias_order.get),
+        )
+
+    def alias_expansions(self, matches: KeywordMatches) -> list:
+        return [self.keywords["aliases"][k] for k in matches.aliases]
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> KeywordMatcher:
+    """keywords.json으로 만든 matcher (프로세스당 한 번만 생성)"""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                _matcher = KeywordMatcher(load_keywords())
+    return _matcher
+
+
+def match_keywords(text: str) -> KeywordMatches:
+    return get_matcher().match(text)
@@ -0,0 +1,177 @@
+# rag/meta_store.py
+# 청크 메타데이터 저장소
+# - compact: <prefix>.ids.npy (정렬된 int64 id) + <prefix>.offsets.npy ((n, 2) [start, end))
+#            + <prefix>.blob (레코드별 UTF-8 JSON을 이어붙인 것)
+#   → mmap으로 열고, 검색된 k개 id만 이진 탐색해서 해당 바이트만 읽음
+# - json: 예전 meta.json ({"<int_id>": {...}}) 그대로 (fallback)
+# 실행: python -m rag.meta_store data/meta.json data/meta   (기존 meta.json → compact 변환)
+import json
+import mmap
+import os
+import sys
+
+import numpy as np
+
+
+def store_paths(prefix: str):
+    return prefix + ".ids.npy", prefix + ".offsets.npy", prefix + ".blob"
+
+
+def compact_store_exists(prefix: str) -> bool:
+    return all(os.path.exists(p) for p in store_paths(prefix))
+
+
+def _save_npy(path: str, arr: np.ndarray):
+    tmp = path + ".tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def write_meta_store(prefix: str, records, aliases=None):
+    """
+    records: (int_id, meta dict) iterable (정렬 안 돼 있어도 됨, 한 번만 순회)
+    aliases: (alias int_id, canonical int_id) iterable → alias id도 canonical 레코드와 같은 offsets를 가리킴
+             (빌드 때 중복 제거된 청크 id로 찾아도 canonical 메타가 나옴, blob은 한 번만 저장)
+    blob은 들어온 순서대로 스트리밍으로 쓰고, ids/offsets만 정렬해서 저장
+    """
+    ids_path, offsets_path, blob_path = store_paths(prefix)
+    d = os.path.dirname(prefix)
+    if d:
+        os.makedirs(d, exist_ok=True)
+
+    ids, starts, ends = [], [], []
+    pos = 0
+    tmp_blob = blob_path + ".tmp"
+    with open(tmp_blob, "wb") as f:
+        for iid, m in records:
+            b = json.dumps(m, ensure_ascii=False).encode("utf-8")
+            f.write(b)
+            ids.append(int(iid))
+            starts.append(pos)
+            pos += len(b)
+            ends.append(pos)
+
+    if aliases:
+        where = {iid: i for i, iid in enumerate(ids)}
+        for alias, canonical in aliases:
+            i = where[int(canonical)]
+            ids.append(int(alias))
+            starts.append(starts[i])
+            ends.append(ends[i])
+
+    ids_np = np.array(ids, dtype=np.int64)
+    offsets = np.stack([np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)], axis=1) \
+        if ids else np.zeros((0, 2), dtype=np.int64)
+
+    order = np.argsort(ids_np, kind="stable")
+    ids_np = ids_np[order]
+    offsets = offsets[order]
+    if len(ids_np) > 1 and np.any(ids_np[1:] == ids_np[:-1]):
+        os.remove(tmp_blob)
+        raise ValueError("meta store에 중복 int_id가 있습니다.")
+
+    _save_npy(ids_path, ids_np)
+    _save_npy(offsets_path, offsets)
+    os.replace(tmp_blob, blob_path)
+    return len(ids_np)
+
+
+class MmapMetaStore:
+    """compact 파일을 mmap으로 연 읽기 전용 메타 저장소"""
+
+    def __init__(self, prefix: str):
+        ids_path, offsets_path, blob_path = store_paths(prefix)
+        self.prefix = prefix
+        self._ids = np.load(ids_path, mmap_mode="r")
+        self._offsets = np.load(offsets_path, mmap_mode="r")
+
+        self._blob_file = open(blob_path, "rb")
+        size = os.fstat(self._blob_file.fileno()).st_size
+        self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return int(self._ids.shape[0])
+
+    def _positions(self, int_ids):
+        """int_ids -> (위치 배열, 존재 여부 배열) : np.searchsorted로 한 번에"""
+        q = np.asarray(int_ids, dtype=np.int64).reshape(-1)
+        n = len(self)
+        if n == 0:
+            return q, np.zeros(q.shape, dtype=bool)
+        pos = np.searchsorted(self._ids, q)
+        pos = np.minimum(pos, n - 1)
+        found = np.asarray(self._ids[pos]) == q
+        return pos, found
+
+    def _record(self, pos: int) -> dict:
+        start, end = self._offsets[pos]
+        return json.loads(self._blob[int(start):int(end)].decode("utf-8"))
+
+    def get_many(self, int_ids) -> list:
+        """int_ids 순서대로 meta dict (없는 id는 None)"""
+        pos, found = self._positions(int_ids)
+        return [self._record(int(p)) if ok else None for p, ok in zip(pos, found)]
+
+    def get(self, key, default=None):
+        # meta.json dict와 같은 사용법 유지: get("<int_id>")
+        try:
+            iid = int(key)
+        except (TypeError, ValueError):
+            return default
+        m = self.get_many([iid])[0]
+        return default if m is None else m
+
+    def items(self):
+        for p in range(len(self)):
+            yield str(int(self._ids[p])), self._record(p)
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob_file.close()
+
+
+class JsonMetaStore:
+    """예전 meta.json (int_id 문자열 -> meta) 을 같은 인터페이스로"""
+
+    def __init__(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            self._meta = json.load(f)
+
+    def __len__(self):
+        return len(self._meta)
+
+    def get_many(self, int_ids) -> list:
+        return [self._meta.get(str(int(i))) for i in int_ids]
+
+    def get(self, key, default=None):
+        return self._meta.get(str(key), default)
+
+    def items(self):
+        return self._meta.items()
+
+    def close(self):
+        pass
+
+
+def open_meta_store(prefix: str, json_path: str):
+    """compact 파일이 있으면 그걸, 없으면 meta.json을 연다"""
+    if compact_store_exists(prefix):
+        return MmapMetaStore(prefix)
+    return JsonMetaStore(json_path)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("usage: python -m rag.meta_store <meta.json> <out_prefix>")
+        sys.exit(1)
+    json_path, prefix = sys.argv[1], sys.argv[2]
+    src = JsonMetaStore(json_path)
+    n = write_meta_store(prefix, ((int(k), m) for k, m in src.items()))
+    print(f"✅ converted {n} records")
+    for p in store_paths(prefix):
+        print(f"- saved: {p}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# rag/metrics.py
+# 파이프라인 단계별 지연 시간 / 카운터 (프로세스 내부, 외부 의존성 없음)
+# - RAG_METRICS=1 일 때만 수집 (기본 꺼짐)
+#   꺼져 있으면 span()은 공유 no-op 객체를 돌려주고 incr()/observe()는 바로 return → 오버헤드 거의 0
+# - 단계(stage)별로 최근 WINDOW개 샘플을 보관해서 p50/p95/p99 계산
+#
+# 사용:
+#   with metrics.span("search"): ...
+#   metrics.incr("gate_rejected")
+#   metrics.snapshot()  → {"enabled": ..., "stages": {...}, "counters": {...}}
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import numpy as np
+
+WINDOW = int(os.environ.get("RAG_METRICS_WINDOW", "2048"))
+
+_enabled = os.environ.get("RAG_METRICS", "0") == "1"
+_lock = threading.Lock()
+_samples = {}   # stage -> deque[seconds] (최근 WINDOW개)
+_totals = {}    # stage -> [count, 합계 seconds] (전체 기간)
+_counters = {}  # name -> int
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(flag: bool = True):
+    """실행 중에 켜고 끄기 (벤치마크 / 디버깅용)"""
+    global _enabled
+    _enabled = flag
+
+
+def observe(stage: str, seconds: float):
+    if not _enabled:
+        return
+    with _lock:
+        d = _samples.get(stage)
+        if d is None:
+            d = _samples[stage] = deque(maxlen=WINDOW)
+            _totals[stage] = [0, 0.0]
+        d.append(seconds)
+        t = _totals[stage]
+        t[0] += 1
+        t[1] += seconds
+
+
+def incr(name: str, n: int = 1):
+    if not _enabled or not n:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class _Span:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(stage: str):
+    """with span("embed"): ... → 블록 실행 시간을 stage에 기록"""
+    return _Span(stage) if _enabled else _NOOP
+
+
+def timed(stage: str):
+    """함수 전체를 span으로 감싸는 데코레이터"""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def snapshot() -> dict:
+    with _lock:
+        samples = {k: np.fromiter(v, dtype="float64") for k, v in _samples.items()}
+        totals = {k: tuple(v) for k, v in _totals.items()}
+        counters = dict(_counters)
+
+    stages = {}
+    for stage, arr in samples.items():
+        count, total = totals[stage]
+        p50, p95, p99 = np.percentile(arr, [50, 95, 99]) * 1000 if len(arr) else (0.0, 0.0, 0.0)
+        stages[stage] = {
+            "count": count,
+            "mean_ms": total / count * 1000 if count else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+        }
+    return {"enabled": _enabled, "window": WINDOW, "stages": stages, "counters": counters}
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _counters.clear()
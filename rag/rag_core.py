@@ -1,21 +1,52 @@
 # rag/rag_core.py
 import os
+import copy
 import json
+import time
+import asyncio
+import threading
+import contextlib
+import contextvars
 import numpy as np
 import faiss
-from openai import OpenAI
+
+from rag.embed_cache import EmbeddingCache
+from rag.embedders import get_embedder, check_compatible, embedder_key
+from rag.answer_cache import SemanticCache
+from rag.meta_store import open_meta_store
+from rag.index_types import apply_search_params
+from rag.keyword_matcher import get_matcher, match_keywords
+from rag.context_builder import build_context
+from rag.alias_vectors import load_alias_vectors, blend
+from rag.search_batcher import get_batcher, configure_faiss
+from rag.single_flight import SingleFlight, normalize_query
+from rag.snapshots import current_paths, manifest_stamp
+from rag import warm_answers
+from rag import metrics
 
 # =========================
 # Paths / Models
 # =========================
-INDEX_PATH = "data/index.faiss"
-META_PATH = "data/meta.json"
-
-EMBED_MODEL = "text-embedding-3-small"
+# index / meta / index_info.json(build_index가 기록한 index 타입 / 검색 파라미터) / alias 벡터는
+# data/manifest.json이 가리키는 snapshot 폴더에서 읽음 (rag/snapshots.py, 없으면 data/ 바로 아래 예전 경로)
+# - meta: compact(meta.ids.npy / meta.offsets.npy / meta.blob, mmap), 없으면 예전 형식 meta.json
+# 새 빌드가 publish되면 이 간격(초)마다 manifest stat을 확인해서 백그라운드로 로드 → 교체 (음수면 안 함)
+RELOAD_CHECK_SECONDS = float(os.environ.get("RAG_RELOAD_CHECK_SECONDS", "2"))
+# RAG_INDEX_MMAP=1 이면 index.faiss를 읽기 전용 mmap으로 엶
+# → 같은 서버의 Streamlit 워커들이 OS page cache에 있는 한 벌을 공유 (워커마다 heap 복사본 X)
+INDEX_MMAP = os.environ.get("RAG_INDEX_MMAP", "0") == "1"
+EMBED_CACHE_PATH = os.environ.get("RAG_EMBED_CACHE_PATH", "data/embed_cache.sqlite")
+
+# 의미 캐시: 코사인 유사도가 이 값 이상이면 같은 질문으로 보고 이전 답변 재사용
+# - 너무 낮추면 "우울증 증상" / "우울증 치료"처럼 다른 질문까지 묶일 수 있음
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_ITEMS = int(os.environ.get("RAG_ANSWER_CACHE_MAX_ITEMS", "512"))
+ANSWER_CACHE_TTL = float(os.environ.get("RAG_ANSWER_CACHE_TTL", str(24 * 3600)))
+
+# 임베딩 백엔드는 rag/embedders.py (RAG_EMBED_BACKEND=openai|local|hashing, 기본 openai)
+# index를 만든 백엔드와 다르면 RagEngine 생성 시 거부
 CHAT_MODEL = "gpt-4o-mini"
 
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-
 # =========================
 # RAG Safety / Policy
 # =========================
@@ -26,137 +57,484 @@ NO_INFO_MSG = "현재 제공된 자료에는 해당 주제가 포함되어 있
 MIN_SCORE = 0.08
 
 # "정신건강 범주"가 아닌 질문은(사과/날씨/프로그래밍 등) 그냥 차단
-MH_KEYWORDS = [
-    # 한국어
-    "정신건강", "멘탈", "마음", "심리", "상담", "치료", "증상", "장애", "질환",
-    "스트레스", "불안", "우울", "공황", "강박", "조현", "양극", "조울",
-    "adhd", "자폐", "ptsd", "트라우마", "섭식", "거식", "폭식",
-    "수면", "불면", "번아웃", "자해", "자살", "공포", "긴장",
+# 키워드 표는 rag/keywords.json ("topic") 에서 관리
+MH_KEYWORDS = get_matcher().keywords["topic"]
+
+def is_mental_health_query(q: str, matches=None) -> bool:
+    if matches is None:
+        matches = match_keywords(q)
+    return bool(matches.topics)
+
+# =========================
+# Engine (index / meta / client) - lazy
+# =========================
+def load_index(path: str, use_mmap: bool = INDEX_MMAP):
+    """
+    FAISS index 로드
+    - use_mmap: 벡터 저장소(IndexFlat 계열 codes)를 복사하지 않고 파일을 그대로 mmap
+      (IndexIDMap2 래퍼의 id 매핑은 작아서 heap으로 읽힘)
+    - 지원하지 않는 faiss 버전/인덱스 타입이면 경고 후 일반 로드
+    """
+    if use_mmap:
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+        if flag is None:
+            print("[WARN] 이 faiss 버전은 IO_FLAG_MMAP_IFC를 지원하지 않아 일반 로드합니다.")
+        else:
+            try:
+                return faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError as e:
+                print("[WARN] index mmap 로드 실패, 일반 로드합니다:", e)
+    return faiss.read_index(path)
+
+def _async_openai_like(client):
+    """sync OpenAI client와 같은 설정(api key / base_url / timeout / 재시도)의 AsyncOpenAI 생성 함수"""
+    def make():
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(
+            api_key=client.api_key, base_url=client.base_url,
+            timeout=client.timeout, max_retries=client.max_retries,
+        )
+    return make
+
+class RagEngine:
+    """
+    검색/생성에 필요한 무거운 객체들을 한 곳에 모아둔 것
+    - FAISS index, meta, 임베딩 백엔드, OpenAI client(생성용), 임베딩/답변 캐시
+    - import 시점이 아니라 get_engine()을 처음 부를 때 한 번만 생성
+      → 인트로 페이지만 보는 사용자는 index 로딩/ API 키 검사 비용을 내지 않음
+    - 프로세스 전역 1개라서 Streamlit 세션/rerun 사이에 공유됨
+    - embedder / client를 넘기면 그것을 씀 (오프라인 벤치마크의 stub 등)
+    - async_client_factory: answer_many가 배치마다 하나 만들어 쓰고 닫는 async client 생성 함수
+      (기본: 직접 만든 OpenAI client와 같은 설정의 AsyncOpenAI, client만 넘겼으면 None → 그 client를 스레드에서)
+    - 경로를 안 주면 지금 publish된 snapshot (version = manifest의 build_id)
+    """
 
-    # 영어 (혹시)
-    "mental health", "stress", "anxiety", "depression", "panic", "ocd",
-    "schizophrenia", "bipolar", "adhd", "autism", "ptsd", "trauma",
-    "eating disorder", "insomnia", "burnout", "self-harm", "suicide",
-]
+    def __init__(
+        self,
+        index_path: str = None,
+        meta_store: str = None,
+        meta_path: str = None,
+        info_path: str = None,
+        alias_path: str = None,
+        embedder=None,
+        client=None,
+        async_client_factory=None,
+    ):
+        t0 = time.perf_counter()
+        version, paths = current_paths()
+        index_path = index_path or paths["index"]
+        meta_store = meta_store or paths["meta_store"]
+        meta_path = meta_path or paths["meta_json"]
+        info_path = info_path or paths["info"]
+        alias_path = alias_path or paths["alias"]
+
+        # RAG_FAISS_THREADS: search 한 번에 쓰는 OpenMP 스레드 수 (동시 검색은 search_batcher가 묶어서 한 번에)
+        self.faiss_threads = configure_faiss()
+        self.index_mmap = INDEX_MMAP
+        self.index = load_index(index_path, self.index_mmap)
+
+        # index_info.json이 없으면 예전 빌드(flat) → 적용할 검색 파라미터 없음
+        self.info = {"index_type": "flat", "search_params": {}}
+        if os.path.exists(info_path):
+            with open(info_path, "r", encoding="utf-8") as f:
+                self.info.update(json.load(f))
+        apply_search_params(self.index, self.info.get("search_params", {}))
+        # 답변 캐시 / single-flight 키에 쓰는 버전 (예전 빌드는 build_id가 없음)
+        self.version = version or self.info.get("build_id") or "legacy"
+        # build_index(string->int64 IDMap) 결과: int_id ->
+        # {"int_id":..., "id":"who_mh_001", "source":..., "title":..., "url":..., "text":...}
+        # compact store는 mmap이라 검색된 청크의 페이지만 실제로 읽힘
+        self.meta = open_meta_store(meta_store, meta_path)
+
+        # 생성용 client는 처음 생성할 때 만듦 (client / property)
+        # → 검색만 하는 경로(retrieve / embed_many / eval_retrieval)는 로컬·hashing 백엔드면 API 키 없이 동작
+        self._client = client
+        self._own_client = client is None
+        self._async_client_factory = async_client_factory
+        self._client_lock = threading.Lock()
+
+        # openai 백엔드면 생성용 client가 이미 있을 때 같이 씀 (없으면 임베더가 처음 쓸 때 만듦)
+        # 빌드 때 차원을 줄였으면(--truncate-dim) 쿼리 벡터도 같은 차원으로
+        self.embedder = embedder or get_embedder(client=self._client, truncate_dim=self.info.get("truncate_dim"))
+        check_compatible(self.embedder, self.info, self.index.d)
+
+        # 같은 (백엔드:모델, 확장 쿼리)는 다시 임베딩하지 않음 (메모리 LRU → SQLite 순으로 조회)
+        self.embed_cache = EmbeddingCache(
+            EMBED_CACHE_PATH, model=embedder_key(self.embedder)
+        )
+        # build_index가 만들어 둔 alias 확장 벡터 (없는 alias는 처음 쓸 때 임베딩해서 채움)
+        self.alias_vectors = load_alias_vectors(alias_path, embedder_key(self.embedder), ALIASES)
+        self.answer_cache = SemanticCache(
+            threshold=ANSWER_CACHE_THRESHOLD,
+            max_items=ANSWER_CACHE_MAX_ITEMS,
+            ttl=ANSWER_CACHE_TTL,
+        )
 
-def is_mental_health_query(q: str) -> bool:
-    t = (q or "").lower()
-    return any(k in t for k in MH_KEYWORDS)
+        self.load_seconds = time.perf_counter() - t0
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    # openai는 import 자체가 무거워서 여기서 import
+                    from openai import OpenAI
+
+                    self._client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        return self._client
+
+    @property
+    def async_client_factory(self):
+        # 직접 만든 OpenAI client면 같은 설정의 AsyncOpenAI, client만 넘겨받았으면 None
+        if self._async_client_factory is None and self._own_client:
+            self._async_client_factory = _async_openai_like(self.client)
+        return self._async_client_factory
+
+_engine = None
+_engine_lock = threading.Lock()
+_engine_auto = False      # get_engine()이 직접 만든 엔진만 자동 교체 (set_engine으로 넣은 stub 등은 그대로)
+# 요청 하나가 처음 잡은 엔진 (도중에 새 snapshot으로 바뀌어도 그 요청은 끝까지 같은 것을 씀)
+_pinned_engine = contextvars.ContextVar("rag_pinned_engine", default=None)
+
+def get_engine() -> RagEngine:
+    """처음 호출될 때 RagEngine 생성 (여러 스레드가 동시에 불러도 한 번만)"""
+    global _engine, _engine_auto
+    pinned = _pinned_engine.get()
+    if pinned is not None:
+        return pinned
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _reload_state["stamp"] = manifest_stamp()
+                _engine = RagEngine()
+                _engine_auto = True
+    return _engine
+
+def engine_loaded() -> bool:
+    return _engine is not None
+
+def set_engine(engine: RagEngine):
+    """직접 만든 RagEngine으로 교체 (벤치마크 / 평가 스크립트용)"""
+    global _engine, _engine_auto
+    with _engine_lock:
+        _engine = engine
+        _engine_auto = False
+
+@contextlib.contextmanager
+def using_engine(engine: RagEngine):
+    """이 블록 안(같은 스레드 / asyncio task)의 get_engine()은 engine"""
+    token = _pinned_engine.set(engine)
+    try:
+        yield engine
+    finally:
+        _pinned_engine.reset(token)
+
+def index_version() -> str:
+    """지금 요청이 쓰는 snapshot 버전 (새 빌드가 publish되어 교체되면 바뀜)"""
+    return get_engine().version
 
 # =========================
-# Load index/meta once
+# Hot reload (새 snapshot publish → 백그라운드 로드 → 교체)
 # =========================
-_index = faiss.read_index(INDEX_PATH)
-with open(META_PATH, "r", encoding="utf-8") as f:
-    # build_index(string->int64 IDMap) 결과:
-    # {"<int_id>": {"int_id":..., "id":"who_mh_001", "source":..., "title":..., "url":..., "text":...}, ...}
-    _meta_by_intid = json.load(f)
+_reload_state = {"checked": 0.0, "stamp": None, "loading": False, "failed": None}
+_reload_lock = threading.Lock()
+
+def check_reload():
+    """
+    manifest가 바뀌었으면 새 snapshot을 백그라운드 스레드에서 로드 (요청은 기다리지 않음)
+    - RELOAD_CHECK_SECONDS마다 stat 한 번 (대부분의 호출은 시간 비교만)
+    - 로드가 끝나면 전역 엔진만 바꿔 끼움 → 진행 중인 요청은 잡고 있던 예전 엔진으로 끝나고,
+      마지막 요청이 끝나면 예전 index / meta mmap은 참조가 없어져서 해제됨
+    - 로드 실패(깨진 빌드 등)는 경고만 하고 예전 엔진으로 계속, 같은 버전은 다시 시도하지 않음
+    """
+    if RELOAD_CHECK_SECONDS < 0 or _engine is None or not _engine_auto:
+        return
+    now = time.monotonic()
+    st = _reload_state
+    if now - st["checked"] < RELOAD_CHECK_SECONDS:
+        return
+    with _reload_lock:
+        if st["loading"] or now - st["checked"] < RELOAD_CHECK_SECONDS:
+            return
+        st["checked"] = now
+        stamp = manifest_stamp()
+        if stamp is None or stamp == st["stamp"]:
+            return
+        st["stamp"] = stamp
+        st["loading"] = True
+    threading.Thread(target=_reload, daemon=True).start()
+
+def _reload():
+    global _engine
+    old = _engine
+    version = None
+    try:
+        version, _ = current_paths()
+        if version is None or version == old.version or version == _reload_state["failed"]:
+            return
+        # 넘겨받은 생성용 client는 그대로 씀 (직접 만드는 client와 임베더는 새 엔진이 처음 쓸 때 다시 만듦)
+        engine = RagEngine(
+            client=None if old._own_client else old._client,
+            async_client_factory=None if old._own_client else old._async_client_factory,
+        )
+        with _engine_lock:
+            if _engine is old and _engine_auto:
+                _engine = engine
+        metrics.incr("index_reload")
+        print(f"[INFO] 새 index snapshot으로 교체했습니다: {old.version} -> {engine.version} "
+              f"({engine.load_seconds:.2f}s)")
+    except Exception as e:
+        _reload_state["failed"] = version
+        print(f"[WARN] 새 index snapshot({version})을 로드하지 못해 이전 것을 계속 씁니다:", e)
+    finally:
+        _reload_state["loading"] = False
 
 # =========================
 # Query expansion (optional)
 # =========================
-ALIASES = {
-    "우울": "depression major depressive disorder clinical depression",
-    "불안": "anxiety disorders generalized anxiety disorder panic disorder",
-    "조현": "schizophrenia psychosis",
-    "강박": "obsessive-compulsive disorder OCD",
-    "양극": "bipolar disorder manic depressive",
-    "adhd": "attention deficit hyperactivity disorder ADHD",
-    "자폐": "autism spectrum disorder ASD",
-    "ptsd": "post-traumatic stress disorder PTSD trauma",
-    "섭식": "eating disorders anorexia bulimia binge eating",
-    "경계성": "borderline personality disorder BPD",
-}
-
-def expand_query(query: str) -> str:
-    q = (query or "").lower()
-    extras = []
-    for k, v in ALIASES.items():
-        if k in q:
-            extras.append(v)
+# 키워드 표는 rag/keywords.json ("aliases") 에서 관리
+ALIASES = get_matcher().keywords["aliases"]
+
+def expand_query(query: str, matches=None) -> str:
+    """텍스트 확장 (예전 방식, 비교용). 검색은 expand_vector의 벡터 확장을 씀"""
+    if matches is None:
+        matches = match_keywords(query)
+    extras = get_matcher().alias_expansions(matches)
     return query + (" " + " ".join(extras) if extras else "")
 
+def alias_vector(key: str) -> np.ndarray:
+    eng = get_engine()
+    v = eng.alias_vectors.get(key)
+    if v is None:
+        # index 빌드 후 keywords.json에 추가/수정된 alias → 처음 쓸 때 한 번만 임베딩
+        v = embed(ALIASES[key])[0]
+        eng.alias_vectors[key] = v
+    return v
+
+def expand_vector(qv: np.ndarray, matches) -> np.ndarray:
+    """원문 쿼리 벡터 (1, d) + 매치된 alias 벡터들의 가중 합 (RAG_ALIAS_WEIGHT)"""
+    return blend(qv, [alias_vector(key) for key in matches.aliases])
+
 # =========================
 # Embedding / Retrieval
 # =========================
 def embed(text: str) -> np.ndarray:
-    resp = client.embeddings.create(model=EMBED_MODEL, input=[text])
-    v = np.array(resp.data[0].embedding, dtype="float32").reshape(1, -1)
-    faiss.normalize_L2(v)
+    eng = get_engine()
+    cached = eng.embed_cache.get(text)
+    if cached is not None:
+        metrics.incr("embed_cache_hit")
+        return cached.reshape(1, -1).copy()
+
+    v = eng.embedder.embed([text])
+    eng.embed_cache.put(text, v)
     return v
 
-def retrieve(query: str, k: int = 6):
-    # expand for search only (alias expansion)
-    q2 = expand_query(query)
-    qv = embed(q2)
+# 한 번의 embedder.embed에 넣을 최대 입력 수 (OpenAI API 한도 2048보다 여유 있게)
+EMBED_BATCH_MAX = 1024
 
-    # ✅ IndexIDMap: "ids" are int64 chunk ids (not positional indices)
-    scores, ids = _index.search(qv, k)
+@metrics.timed("embed")
+def embed_many(texts: list) -> np.ndarray:
+    """
+    여러 텍스트를 (n, d) 행렬로 임베딩
+    - 캐시에 있는 것은 건너뛰고, 나머지만 EMBED_BATCH_MAX개씩 묶어서 요청
+    """
+    eng = get_engine()
+    rows = [eng.embed_cache.get(t) for t in texts]
+
+    # 같은 텍스트가 여러 번 들어와도 한 번만 요청
+    todo = {}
+    for i, v in enumerate(rows):
+        if v is None:
+            todo.setdefault(texts[i], []).append(i)
+    missing = list(todo)
+
+    for start in range(0, len(missing), EMBED_BATCH_MAX):
+        batch = missing[start:start + EMBED_BATCH_MAX]
+        vs = eng.embedder.embed(batch)
+        for text, v in zip(batch, vs):
+            eng.embed_cache.put(text, v)
+            for i in todo[text]:
+                rows[i] = v
+
+    if not rows:
+        return np.zeros((0, eng.index.d), dtype="float32")
+    return np.vstack(rows).astype("float32")
+
+def embed_cache_stats() -> dict:
+    return get_engine().embed_cache.stats()
+
+@metrics.timed("embed")
+def embed_query_pair(query: str, matches=None):
+    """
+    (원문 벡터, alias 확장 벡터)
+    - 임베딩은 원문 그대로 (짧고 캐시에 잘 걸림), alias 확장은 벡터 공간에서 → 검색(FAISS)에만 씀
+    - 답변 캐시는 원문 벡터로 (같은 alias를 가진 다른 질문끼리 확장 벡터가 비슷해져서 잘못 hit 되지 않도록)
+    """
+    if matches is None:
+        matches = match_keywords(query)
+    raw = embed(query)
+    return raw, expand_vector(raw, matches)
 
-    hits = []
-    for score, cid in zip(scores[0], ids[0]):
-        if cid == -1:
-            continue
-        hits.append((float(score), int(cid)))
-    return hits
+def embed_query(query: str, matches=None) -> np.ndarray:
+    """검색용 쿼리 벡터 (alias 확장 포함)"""
+    return embed_query_pair(query, matches)[1]
+
+def search(qv: np.ndarray, k: int = 6):
+    return search_many(qv, k)[0]
+
+@metrics.timed("search")
+def search_many(qvs: np.ndarray, k: int = 6):
+    """(n, d) 쿼리 행렬을 FAISS search 한 번으로 처리 → 쿼리별 [(score, int_id), ...]"""
+    # ✅ IndexIDMap: "ids" are int64 chunk ids (not positional indices)
+    # 다른 세션에서 동시에 들어온 검색과 한 번의 배치 search로 묶임 (rag/search_batcher.py)
+    scores, ids = get_batcher().search(get_engine().index, qvs, k)
+
+    results = []
+    for row_scores, row_ids in zip(scores, ids):
+        hits = []
+        for score, cid in zip(row_scores, row_ids):
+            if cid == -1:
+                continue
+            hits.append((float(score), int(cid)))
+        results.append(hits)
+    return results
+
+@metrics.timed("retrieve")
+def retrieve(query: str, k: int = 6):
+    return search(embed_query(query), k)
 
 # =========================
 # Answer
 # =========================
+def answer_cache_stats() -> dict:
+    return get_engine().answer_cache.stats()
+
+def metrics_snapshot() -> dict:
+    """단계별 지연 시간(p50/p95/p99) + 카운터 (RAG_METRICS=1 일 때만 수집)"""
+    return metrics.snapshot()
+
+# 같은 질문이 동시에 들어오면 (샘플 질문 버튼 등) 계산 한 번을 같이 기다림
+_flights = SingleFlight()
+
+def single_flight_stats() -> dict:
+    return _flights.stats()
+
+def _flight_key(kind: str, query: str, k: int, engine: RagEngine):
+    return (kind, normalize_query(query), k, engine.version)
+
+def _warm(query: str, k: int, engine: RagEngine):
+    """예시 질문이면 지금 index 빌드로 미리 만든 답변 (rag/warm_answers.py), 아니면 None"""
+    result = warm_answers.lookup(engine.info.get("build_id"), query, k)
+    if result is not None:
+        metrics.incr("warm_hit")
+    return result
+
+def _outcome(result: dict) -> dict:
+    if result.get("answer") == NO_INFO_MSG:
+        metrics.incr("no_info")
+    return result
+
+@metrics.timed("answer")
 def answer(query: str, k: int = 4):
     """
     - 정신건강 범주 밖 질문: 즉시 NO_INFO_MSG
+    - 의미 캐시: 비슷한 질문(코사인 >= ANSWER_CACHE_THRESHOLD)의 답이 있으면 그대로 반환
     - retrieval: top-k보다 조금 더 크게 뽑고(기본 6), 점수 컷(MIN_SCORE) 적용 후 상위 k개 사용
     - hits 없으면 GPT 호출 금지
     - GPT가 NO_INFO_MSG를 말하면 출처 링크 절대 붙이지 않음
+    - 같은 질문(정규화 후) + k + index 버전으로 동시에 들어온 호출은 계산 한 번을 같이 씀
+    - 예시 질문은 빌드 때 미리 만든 답변을 바로 반환 (rag/warm_answers.py)
+    - 새 index가 publish되면 다음 요청부터 새 snapshot (이 요청은 시작할 때의 snapshot으로 끝남)
     """
+    check_reload()
+    eng = get_engine()
+    warm = _warm(query, k, eng)
+    if warm is not None:
+        return _outcome(warm)
+    return _flights.do(_flight_key("answer", query, k, eng), lambda: _answer_on(eng, query, k))
+
+def _answer_on(eng: RagEngine, query: str, k: int):
+    with using_engine(eng):
+        return _answer(query, k)
+
+def _answer(query: str, k: int):
     q = (query or "").strip()
     if not q:
-        return {"answer": NO_INFO_MSG, "citations": []}
+        return _outcome({"answer": NO_INFO_MSG, "citations": []})
 
     # 1) 정신건강 범주 아닌 질문은 차단 (사과 같은 케이스 방지)
-    if not is_mental_health_query(q):
+    #    키워드 스캔은 한 번만 하고 게이트/alias 확장에 같이 씀
+    matches = match_keywords(q)
+    if not is_mental_health_query(q, matches):
+        metrics.incr("gate_rejected")
+        return _outcome({"answer": NO_INFO_MSG, "citations": []})
+
+    # 2) 의미 캐시 조회(원문 벡터) → 검색(확장 벡터, 조금 넉넉히 뽑고 필터링)
+    raw, qv = embed_query_pair(q, matches)
+    version = index_version()
+    cached = get_engine().answer_cache.lookup(raw, version, k)
+    if cached is not None:
+        metrics.incr("answer_cache_hit")
+        return _outcome(cached)
+
+    result = _answer_from_vector(q, qv, k)
+    get_engine().answer_cache.store(raw, result, version, k)
+    return _outcome(result)
+
+def _answer_from_vector(q: str, qv: np.ndarray, k: int):
+    prepared = _prepare_generation(q, qv, k)
+    if prepared is None:
         return {"answer": NO_INFO_MSG, "citations": []}
+    messages, citations, context_tokens = prepared
 
-    # 2) 검색 (조금 넉넉히 뽑고 필터링)
-    hits = retrieve(q, k=max(k * 2, 6))
-    hits = [(s, cid) for s, cid in hits if s >= MIN_SCORE]
-    hits = hits[:k]
+    # 5) Generate
+    with metrics.span("generate"):
+        resp = get_engine().client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            temperature=0.2,
+        )
 
-    # ✅ hits 없으면 GPT 호출 자체를 안 함
-    if not hits:
-        return {"answer": NO_INFO_MSG, "citations": []}
+    bot_answer = (resp.choices[0].message.content or "").strip()
+    return _finalize(bot_answer, citations, context_tokens)
 
-    # 3) 컨텍스트 구성
-    contexts = []
-    citations = []
+def _prepare_generation(q: str, qv: np.ndarray, k: int):
+    """검색 + 프롬프트 구성. GPT를 부를 필요가 없으면 None"""
+    return _build_messages(q, search(qv, k=search_k(k)), k)
 
-    # debug
-    print("QUERY:", q)
-    print("HITS (after threshold):")
+def search_k(k: int) -> int:
+    # top-k보다 조금 더 크게 뽑아두고 MIN_SCORE로 거름
+    return max(k * 2, 6)
 
-    for score, cid in hits:
-        m = _meta_by_intid.get(str(cid))
-        if not m:
-            continue
+@metrics.timed("prompt")
+def _build_messages(q: str, hits: list, k: int):
+    n_hits = len(hits)
+    hits = [(s, cid) for s, cid in hits if s >= MIN_SCORE]
+    metrics.incr("threshold_dropped", n_hits - len(hits))
+    hits = hits[:k]
 
-        print("HIT:", score, m.get("title"))
+    # ✅ hits 없으면 GPT 호출 자체를 안 함
+    if not hits:
+        metrics.incr("no_hits")
+        return None
 
-        citations.append({**m, "score": score})
+    # 3) 컨텍스트 구성 (토큰 예산 / 중복 청크 제거는 rag/context_builder.py)
+    # debug (RAG_METRICS=1일 때만, 요청마다 stdout에 쓰지 않도록)
+    if metrics.enabled():
+        print("QUERY:", q)
+        print("HITS (after threshold):")
 
-        chunk_text = (m.get("text") or "").strip()
-        contexts.append(
-            f"[{m.get('source','')} | {m.get('title','')}]\n"
-            f"URL: {m.get('url','')}\n"
-            f"CONTENT:\n{chunk_text}"
-        )
+    metas = get_engine().meta.get_many([cid for _, cid in hits])
+    context_block, citations, context_tokens = build_context(hits, metas)
 
     # 혹시 meta 누락 등으로 컨텍스트가 비면 종료
-    if not contexts:
-        return {"answer": NO_INFO_MSG, "citations": []}
+    if not citations:
+        return None
 
-    context_block = "\n\n".join(contexts)
-    print("CONTEXT_SAMPLE:\n", context_block[:500])
+    if metrics.enabled():
+        print("CONTEXT_TOKENS:", context_tokens)
+        print("CONTEXT_SAMPLE:\n", context_block[:500])
 
     # 4) System prompt
     # - "자료 없으면 딱 한 문장" 강제
@@ -167,8 +545,7 @@ def answer(query: str, k: int = 4):
         "If the sources are insufficient, say you do not have enough information. "
         "Do NOT mention sources, links, or references in the answer text. "
         "Do not provide medical diagnosis or personalized treatment advice."
-    )   
-
+    )
 
     user = (
         f"Question:\n{q}\n\n"
@@ -176,21 +553,17 @@ def answer(query: str, k: int = 4):
         "Write a concise, helpful answer in Korean."
     )
 
-    # 5) Generate
-    resp = client.chat.completions.create(
-        model=CHAT_MODEL,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        temperature=0.2,
-    )
-
-    bot_answer = (resp.choices[0].message.content or "").strip()
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+    return messages, citations, context_tokens
 
+def _finalize(bot_answer: str, citations: list, context_tokens: int):
+    # context_tokens: 프롬프트 Sources 블록에 쓴 토큰 수 (비용/지연 모니터링용)
     # ✅ 자료 없음 응답이면 출처 링크/시테이션 둘 다 제거
     if bot_answer == NO_INFO_MSG:
-        return {"answer": bot_answer, "citations": []}
+        return {"answer": bot_answer, "citations": [], "context_tokens": context_tokens}
 
     # 6) 출처 링크 붙이기 (정신건강 질문에서만, 그리고 NO_INFO가 아닐 때만)
     #    - top1만 붙임 (원하면 top3로 확장 가능)
@@ -202,4 +575,234 @@ def answer(query: str, k: int = 4):
         if title and url:
             bot_answer += f"\n\n더 자세한 정보는 [{source}의 {title}]({url})를 참고하세요."
 
-    return {"answer": bot_answer, "citations": citations}
+    return {"answer": bot_answer, "citations": citations, "context_tokens": context_tokens}
+
+# =========================
+# Streaming answer
+# =========================
+def answer_stream(query: str, k: int = 4):
+    """
+    answer()와 같은 파이프라인이지만 토큰이 도착하는 대로 yield 하는 제너레이터
+
+    이벤트:
+    - {"type": "token", "text": "..."}                      : 본문 조각 (출처 문구 제외)
+    - {"type": "done", "answer": "...", "citations": [...]}  : 최종 결과 (answer()와 동일한 값)
+
+    - NO_INFO_MSG: 누적 본문이 NO_INFO_MSG의 접두사인 동안에는 토큰을 내보내지 않고 버퍼링
+      → 최종적으로 NO_INFO_MSG면 token 없이 done만 나감 (출처 링크/citations 없음)
+    - 게이트 차단 / 캐시 hit / hits 없음: token 없이 done 한 번
+    - 같은 질문이 동시에 스트리밍 중이면 그 이벤트를 같이 받음 (생성은 한 번)
+    - 예시 질문(미리 만든 답변): token 없이 done 한 번
+    """
+    check_reload()
+    eng = get_engine()
+    warm = _warm(query, k, eng)
+    if warm is not None:
+        yield {"type": "done", **_outcome(warm)}
+        return
+    yield from _flights.stream(_flight_key("stream", query, k, eng), lambda: _answer_stream_on(eng, query, k))
+
+def _answer_stream_on(eng: RagEngine, query: str, k: int):
+    # single-flight 스레드 하나가 끝까지 돌리므로 그 스레드에서 엔진을 고정
+    with using_engine(eng):
+        yield from _answer_stream(query, k)
+
+def _answer_stream(query: str, k: int):
+    q = (query or "").strip()
+    matches = match_keywords(q)
+    if not q or not is_mental_health_query(q, matches):
+        if q:
+            metrics.incr("gate_rejected")
+        yield {"type": "done", **_outcome({"answer": NO_INFO_MSG, "citations": []})}
+        return
+
+    raw, qv = embed_query_pair(q, matches)
+    version = index_version()
+    cached = get_engine().answer_cache.lookup(raw, version, k)
+    if cached is not None:
+        metrics.incr("answer_cache_hit")
+        yield {"type": "done", **_outcome(cached)}
+        return
+
+    prepared = _prepare_generation(q, qv, k)
+    if prepared is None:
+        result = {"answer": NO_INFO_MSG, "citations": []}
+        get_engine().answer_cache.store(raw, result, version, k)
+        yield {"type": "done", **_outcome(result)}
+        return
+    messages, citations, context_tokens = prepared
+
+    # generate_stream: 요청 ~ 마지막 토큰 (화면 그리는 시간 포함), first_token: 요청 ~ 첫 토큰
+    t0 = time.perf_counter()
+    stream = get_engine().client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        temperature=0.2,
+        stream=True,
+    )
+
+    parts = []
+    held = True  # 아직 NO_INFO_MSG일 가능성이 있어서 내보내지 않고 있는 상태
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        piece = chunk.choices[0].delta.content
+        if not piece:
+            continue
+        if not parts:
+            metrics.observe("first_token", time.perf_counter() - t0)
+        parts.append(piece)
+
+        if held:
+            so_far = "".join(parts).lstrip()
+            if NO_INFO_MSG.startswith(so_far):
+                continue
+            held = False
+            yield {"type": "token", "text": so_far}
+        else:
+            yield {"type": "token", "text": piece}
+
+    metrics.observe("generate_stream", time.perf_counter() - t0)
+
+    bot_answer = "".join(parts).strip()
+    if held and bot_answer and bot_answer != NO_INFO_MSG:
+        yield {"type": "token", "text": bot_answer}
+
+    result = _finalize(bot_answer, citations, context_tokens)
+    get_engine().answer_cache.store(raw, result, version, k)
+    yield {"type": "done", **_outcome(result)}
+
+# =========================
+# Async / batch answer
+# =========================
+# 오프라인 평가, FAQ 대량 생성용
+# - 임베딩: 전부 모아서 embed_many (요청 수 최소화)
+# - 검색: 쌓은 쿼리 행렬로 FAISS search 한 번
+# - 생성: 엔진의 async client(기본 AsyncOpenAI) + Semaphore(concurrency)로 동시 실행
+#   (async client가 없으면 엔진의 sync client를 스레드에서)
+# - 결과는 입력 순서 그대로, 한 질문의 실패가 다른 질문에 영향 주지 않음
+#   (실패한 항목은 {"answer": "", "citations": [], "error": "..."} )
+
+def _error_result(e: Exception):
+    return {"answer": "", "citations": [], "error": f"{type(e).__name__}: {e}"}
+
+async def _agenerate(aclient, messages):
+    with metrics.span("generate"):
+        if aclient is None:
+            resp = await asyncio.to_thread(
+                get_engine().client.chat.completions.create,
+                model=CHAT_MODEL,
+                messages=messages,
+                temperature=0.2,
+            )
+        else:
+            resp = await aclient.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                temperature=0.2,
+            )
+    return (resp.choices[0].message.content or "").strip()
+
+async def answer_async(query: str, k: int = 4):
+    """answer()의 asyncio 버전 (블로킹 임베딩/검색은 스레드에서, 생성은 엔진의 async client)"""
+    return (await answer_many([query], k=k, concurrency=1, raise_errors=True))[0]
+
+async def answer_many(queries: list, k: int = 4, concurrency: int = 8, raise_errors: bool = False):
+    # 배치 전체가 같은 snapshot으로 (asyncio task / to_thread는 contextvar를 물려받음)
+    check_reload()
+    with using_engine(get_engine()):
+        return await _answer_many(queries, k, concurrency, raise_errors)
+
+async def _answer_many(queries: list, k: int, concurrency: int, raise_errors: bool):
+    results = [None] * len(queries)
+    qs = [(query or "").strip() for query in queries]
+
+    # 1) 게이트: 빈 질문 / 정신건강 범주 밖은 바로 NO_INFO
+    todo = []
+    matched = {}
+    for i, q in enumerate(qs):
+        matches = match_keywords(q)
+        if not q or not is_mental_health_query(q, matches):
+            if q:
+                metrics.incr("gate_rejected")
+            results[i] = _outcome({"answer": NO_INFO_MSG, "citations": []})
+        else:
+            todo.append(i)
+            matched[i] = matches
+    if not todo:
+        return results
+
+    # 2) 임베딩 일괄 처리 (배치 전체가 실패하면 질문별로 다시 시도해서 실패를 격리)
+    try:
+        qmat = await asyncio.to_thread(embed_many, [qs[i] for i in todo])
+        vectors = {i: qmat[j:j + 1] for j, i in enumerate(todo)}
+    except Exception:
+        vectors = {}
+        for i in todo:
+            try:
+                vectors[i] = await asyncio.to_thread(embed, qs[i])
+            except Exception as e:
+                if raise_errors:
+                    raise
+                results[i] = _error_result(e)
+        todo = [i for i in todo if i in vectors]
+
+    # alias 확장은 벡터 공간에서 (빌드 때 만든 alias 벡터 → 보통 추가 요청 없음)
+    # 답변 캐시는 원문 벡터(vectors), 검색은 확장 벡터(expanded)
+    expanded = {i: expand_vector(vectors[i], matched[i]) for i in todo}
+
+    # 3) 의미 캐시 → 남은 것만 FAISS search 한 번
+    version = index_version()
+    pending = []
+    for i in todo:
+        cached = get_engine().answer_cache.lookup(vectors[i], version, k)
+        if cached is not None:
+            metrics.incr("answer_cache_hit")
+            results[i] = _outcome(cached)
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+
+    # 같은 배치 안의 같은 질문(정규화 기준)은 처음 것 하나만 검색/생성하고 결과를 복사
+    groups = {}
+    for i in pending:
+        groups.setdefault(normalize_query(qs[i]), []).append(i)
+    pending = [idx[0] for idx in groups.values()]
+
+    qmat = np.vstack([expanded[i] for i in pending])
+    all_hits = await asyncio.to_thread(search_many, qmat, search_k(k))
+
+    # 4) 생성 (동시 실행 수 제한)
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(aclient, i, hits):
+        try:
+            prepared = _build_messages(qs[i], hits, k)
+            if prepared is None:
+                result = {"answer": NO_INFO_MSG, "citations": []}
+            else:
+                messages, citations, context_tokens = prepared
+                async with sem:
+                    bot_answer = await _agenerate(aclient, messages)
+                result = _finalize(bot_answer, citations, context_tokens)
+        except Exception as e:
+            if raise_errors:
+                raise
+            results[i] = _error_result(e)
+            return
+        get_engine().answer_cache.store(vectors[i], result, version, k)
+        results[i] = _outcome(result)
+
+    factory = get_engine().async_client_factory
+    if factory is None:
+        await asyncio.gather(*(one(None, i, hits) for i, hits in zip(pending, all_hits)))
+    else:
+        async with factory() as aclient:
+            await asyncio.gather(*(one(aclient, i, hits) for i, hits in zip(pending, all_hits)))
+
+    for first, *dups in groups.values():
+        for i in dups:
+            metrics.incr("coalesced")
+            results[i] = copy.deepcopy(results[first])
+    return results
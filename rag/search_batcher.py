@@ -0,0 +1,137 @@
+# rag/search_batcher.py
+# 동시에 들어온 FAISS search를 한 번의 배치 search로 묶기 (micro-batching)
+# - Streamlit 세션마다 (1, d) 쿼리로 index.search를 따로 부르면 flat index를 쿼리 수만큼 훑고,
+#   각자의 OpenMP 스레드끼리 코어를 두고 경쟁함 → 묶어서 (n, d) 한 번으로
+# - 별도 스레드 없음: 배치를 처음 연 호출자(leader)가 모아서 실행하고, 나머지는 결과만 기다림
+#   · 같은 index에서 실행 중인 search가 없으면 바로 출발 (혼자인 호출자를 기다리게 하지 않음,
+#     WINDOW_MS > 0이면 그만큼 모으고 출발 - 기본 0)
+#   · 실행 중이면 그동안 들어온 쿼리들을 모아서, 실행 중인 search가 끝나면 다음 배치로 출발
+#     (동시에 두 번 돌려봐야 같은 코어/메모리 대역폭을 나눠 쓸 뿐이라 기다리는 게 이득)
+#   · MAX_BATCH 행이 차면 바로 출발
+# - index 객체별로 따로 묶음 (다른 index의 쿼리가 섞이지 않음)
+# - k가 다른 쿼리도 같은 배치: 가장 큰 k로 한 번 검색하고 호출자별로 잘라서 돌려줌
+import os
+import threading
+
+import numpy as np
+import faiss
+
+from rag import metrics
+
+# idle일 때 더 모으려고 기다리는 시간. 0(기본)이면 바로 출발하고, 실행 중에 들어온 쿼리만 묶음
+SEARCH_BATCH_WINDOW_MS = float(os.environ.get("RAG_SEARCH_BATCH_WINDOW_MS", "0"))
+# 1 이하면 묶지 않고 바로 index.search
+SEARCH_BATCH_MAX = int(os.environ.get("RAG_SEARCH_BATCH_MAX", "64"))
+# 실행 중인 search를 기다리는 최대 시간 (오래 걸리는 배치 뒤에 무한정 줄 서지 않도록)
+BUSY_WAIT_MAX = 1.0
+# FAISS(OpenMP) 스레드 수. 0이면 faiss 기본값(코어 수)
+FAISS_THREADS = int(os.environ.get("RAG_FAISS_THREADS", "0"))
+# 최근 faiss 기본 설정(distance_compute_blas_threshold)에서는 flat search가 작은 배치도 쿼리마다 따로 훑어서
+# 묶은 이득이 없음 → 이 행 수 이상인 배치만 BLAS(행렬 곱) 경로로 (1~2행은 기존 경로가 더 빠름, 0이면 안 건드림)
+# 설정이 프로세스 전역이라 다른 index의 search와 동시에 돌면 한쪽이 덜 빠른 경로를 탈 수 있음 (결과는 같음)
+BLAS_MIN_BATCH = int(os.environ.get("RAG_FAISS_BLAS_MIN_BATCH", "3"))
+_DEFAULT_BLAS_THRESHOLD = faiss.cvar.distance_compute_blas_threshold
+
+
+def configure_faiss(threads: int = FAISS_THREADS) -> int:
+    """FAISS가 한 번의 search에 쓰는 스레드 수 (프로세스 전역) → 실제 스레드 수"""
+    if threads > 0:
+        faiss.omp_set_num_threads(threads)
+    return faiss.omp_get_max_threads()
+
+
+class _Batch:
+    def __init__(self, index):
+        self.index = index
+        self.queries = []
+        self.ks = []
+        self.rows = 0
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SearchBatcher:
+    def __init__(self, window_ms: float = SEARCH_BATCH_WINDOW_MS, max_batch: int = SEARCH_BATCH_MAX):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending = {}   # id(index) -> 모으는 중인 _Batch
+        self._running = {}   # id(index) -> 실행 중인 배치 수
+
+    def search(self, index, qvs: np.ndarray, k: int):
+        """index.search(qvs, k)와 같은 (scores, ids)"""
+        if self.max_batch <= 1:
+            return index.search(qvs, k)
+
+        key = id(index)
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None or batch.index is not index
+            if leader:
+                batch = _Batch(index)
+                self._pending[key] = batch
+                busy = self._running.get(key, 0) > 0
+            start = batch.rows
+            batch.queries.append(qvs)
+            batch.ks.append(k)
+            batch.rows += len(qvs)
+            if batch.rows >= self.max_batch:
+                # 다 찼으면 다음 쿼리부터는 새 배치
+                self._pending.pop(key, None)
+                batch.full.set()
+
+        if leader:
+            if busy:
+                batch.full.wait(BUSY_WAIT_MAX)
+            elif self.window > 0:
+                batch.full.wait(self.window)
+            self._run(key, batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        scores, ids = batch.result
+        return scores[start:start + len(qvs), :k], ids[start:start + len(qvs), :k]
+
+    def _run(self, key, batch: _Batch):
+        with self._lock:
+            if self._pending.get(key) is batch:
+                self._pending.pop(key)
+            self._running[key] = self._running.get(key, 0) + 1
+        try:
+            q = batch.queries[0] if len(batch.queries) == 1 else np.vstack(batch.queries)
+            if BLAS_MIN_BATCH > 0 and batch.rows >= BLAS_MIN_BATCH:
+                faiss.cvar.distance_compute_blas_threshold = 1
+            batch.result = batch.index.search(q, max(batch.ks))
+            metrics.incr("search_batches")
+            metrics.incr("search_batched_queries", len(batch.queries))
+        except Exception as e:
+            batch.error = e
+        finally:
+            if BLAS_MIN_BATCH > 0:
+                faiss.cvar.distance_compute_blas_threshold = _DEFAULT_BLAS_THRESHOLD
+            with self._lock:
+                self._running[key] -= 1
+                if not self._running[key]:
+                    del self._running[key]
+                    # 기다리던 다음 배치 출발
+                    nxt = self._pending.get(key)
+                    if nxt is not None:
+                        nxt.full.set()
+            batch.done.set()
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> SearchBatcher:
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = SearchBatcher()
+    return _batcher
@@ -0,0 +1,120 @@
+# rag/single_flight.py
+# 같은 질문이 동시에 여러 번 들어오면 실제 계산(임베딩 + 검색 + 생성)은 한 번만 (single-flight)
+# - 키: 정규화한 질문 + k + index 버전 (호출하는 쪽에서 만듦)
+# - 첫 호출이 계산하고, 같은 키로 그동안 들어온 호출은 그 결과를 같이 받음
+#   · do (결과 하나): 첫 호출자의 스레드에서 바로 계산 (경쟁이 없으면 스레드 생성/전달 비용 없음)
+#   · stream: 계산을 별도 스레드에서 돌리고 이벤트(token / done)를 도착하는 대로 모든 호출자에게 전달
+#     → 첫 호출자가 중간에 떠나도(Streamlit rerun 등) 나머지는 끝까지 받음
+# - 끝나면 키를 지움 → 이후 같은 질문은 답변 캐시(answer_cache)가 처리
+import threading
+import unicodedata
+
+from rag import metrics
+
+
+def normalize_query(q: str) -> str:
+    """공백/유니코드 조합형/대소문자 차이만 있는 질문은 같은 키"""
+    return " ".join(unicodedata.normalize("NFKC", q or "").split()).lower()
+
+
+class _Flight:
+    def __init__(self):
+        self.events = []
+        self.finished = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def publish(self, ev):
+        with self.cond:
+            self.events.append(ev)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.error = error
+            self.finished = True
+            self.cond.notify_all()
+
+    def follow(self):
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.events) and not self.finished:
+                    self.cond.wait()
+                batch = self.events[i:]
+                finished = self.finished
+            i += len(batch)
+            yield from batch
+            if finished:
+                break
+        if self.error is not None:
+            raise self.error
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.coalesced = 0
+
+    def stream(self, key, make_iter):
+        """make_iter()의 이벤트를 key당 한 번만 계산해서 같은 key의 동시 호출자 모두에게"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                threading.Thread(target=self._run, args=(key, flight, make_iter), daemon=True).start()
+            else:
+                self.coalesced += 1
+                metrics.incr("coalesced")
+        return flight.follow()
+
+    def do(self, key, fn):
+        """결과 하나짜리 fn()을 key당 한 번만 (첫 호출자가 자기 스레드에서 계산, 나머지는 기다림)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self.coalesced += 1
+                metrics.incr("coalesced")
+
+        if not leader:
+            result = None
+            for result in flight.follow():
+                pass
+            return result
+
+        error = None
+        try:
+            result = fn()
+            flight.publish(result)
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.finish(error)
+
+    def _run(self, key, flight: _Flight, make_iter):
+        error = None
+        try:
+            for ev in make_iter():
+                flight.publish(ev)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.finish(error)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "coalesced": self.coalesced}
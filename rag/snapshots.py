@@ -0,0 +1,103 @@
+# rag/snapshots.py
+# index 빌드 결과를 버전별 폴더(snapshot)에 두고, manifest로 "지금 버전"을 알림
+# - build_index: data/snapshots/<build_id>/ 에 index.faiss / index_info.json / meta.* / alias_vectors.npz를 다 쓰고
+#   마지막에 data/manifest.json을 원자적으로 교체(publish) → 서비스는 반쯤 쓴 빌드를 보지 않음
+# - rag_core: manifest의 stat만 가끔 확인하다가 버전이 바뀌면 백그라운드로 새 snapshot을 로드해서 교체
+#   (진행 중인 요청은 시작할 때 잡은 예전 snapshot으로 끝남)
+# - 오래된 snapshot 폴더는 publish 후 KEEP_SNAPSHOTS개만 남기고 지움
+# - manifest가 없으면 예전 방식(data/ 바로 아래 파일들)을 그대로 씀
+import os
+import json
+import time
+import shutil
+
+MANIFEST_PATH = "data/manifest.json"
+SNAPSHOT_DIR = "data/snapshots"
+LEGACY_DIR = "data"
+# 지금 버전 포함해서 남길 snapshot 수 (예전 버전으로 아직 돌고 있는 프로세스가 읽을 수 있도록 여유)
+KEEP_SNAPSHOTS = int(os.environ.get("RAG_KEEP_SNAPSHOTS", "3"))
+
+
+def snapshot_paths(root: str) -> dict:
+    """snapshot 폴더 안의 파일 경로 (예전 방식 data/ 도 파일 이름은 같음)"""
+    return {
+        "index": os.path.join(root, "index.faiss"),
+        "info": os.path.join(root, "index_info.json"),
+        "meta_store": os.path.join(root, "meta"),   # meta.ids.npy / meta.offsets.npy / meta.blob
+        "meta_json": os.path.join(root, "meta.json"),
+        "alias": os.path.join(root, "alias_vectors.npz"),
+    }
+
+
+def read_manifest(path: str = MANIFEST_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print("[WARN] manifest.json을 읽지 못했습니다:", e)
+        return None
+
+
+def manifest_stamp(path: str = MANIFEST_PATH):
+    """manifest가 바뀌었는지 보는 값 (stat만 하므로 저렴, 없으면 None)"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def current_paths(path: str = MANIFEST_PATH):
+    """(버전, 파일 경로들). manifest가 없으면 (None, data/ 아래 예전 경로)"""
+    m = read_manifest(path)
+    if m is None:
+        return None, snapshot_paths(LEGACY_DIR)
+    root = os.path.join(os.path.dirname(path), m["path"])
+    return m["version"], snapshot_paths(root)
+
+
+def new_snapshot(version: str, root: str = SNAPSHOT_DIR) -> dict:
+    snap = os.path.join(root, version)
+    os.makedirs(snap, exist_ok=True)
+    return snapshot_paths(snap)
+
+
+def publish(version: str, path: str = MANIFEST_PATH, root: str = SNAPSHOT_DIR):
+    """snapshot 파일을 다 쓴 뒤에 호출 → manifest 교체 (os.replace라 읽는 쪽은 예전/새 것 중 하나만 봄)"""
+    manifest = {
+        "version": version,
+        "path": os.path.relpath(os.path.join(root, version), os.path.dirname(path) or "."),
+        "published_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return manifest
+
+
+def prune(keep: int = KEEP_SNAPSHOTS, path: str = MANIFEST_PATH, root: str = SNAPSHOT_DIR) -> list:
+    """지금 버전 + 최근 것까지 keep개만 남기고 snapshot 폴더 삭제 → 지운 버전들"""
+    if not os.path.isdir(root):
+        return []
+    m = read_manifest(path)
+    current = m["version"] if m else None
+    dirs = [d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))]
+    dirs.sort(key=lambda d: os.path.getmtime(os.path.join(root, d)), reverse=True)
+    kept = [current] if current in dirs else []
+    removed = []
+    for d in dirs:
+        if d in kept:
+            continue
+        if len(kept) < keep:
+            kept.append(d)
+            continue
+        try:
+            shutil.rmtree(os.path.join(root, d))
+            removed.append(d)
+        except OSError as e:
+            # Windows에서 아직 다른 프로세스가 mmap 중이면 못 지움 → 다음 빌드 때 다시 시도
+            print(f"[WARN] 예전 snapshot을 지우지 못했습니다 ({d}):", e)
+    return removed
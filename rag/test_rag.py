@@ -1,11 +1,12 @@
-from rag_core import answer
+from rag.rag_core import answer
 
+# 실제 OpenAI API를 호출함 (OPENAI_API_KEY 필요, repo 루트에서 python -m rag.test_rag)
 res = answer("우울증이 뭐야?", k=4)
 
 print("\n=== ANSWER ===")
 print(res["answer"])
 
 print("\n=== CONTEXTS USED ===")
-for i, c in enumerate(res["contexts"], 1):
-    print(f"\n--- chunk {i} ---")
-    print(c[:400])
+for i, c in enumerate(res["citations"], 1):
+    print(f"\n--- chunk {i} (score={c['score']:.4f}) {c.get('title', '')} ---")
+    print((c.get("text") or "")[:400])
@@ -0,0 +1,25 @@
+# rag/tokens.py
+# 토큰 수 세기 (임베딩 배치 크기 / 컨텍스트 토큰 예산에 같이 씀)
+# - tiktoken이 있으면 모델 토크나이저로 정확히, 없으면 글자 수 기반 추정
+try:
+    import tiktoken
+except ImportError:  # 없으면 글자 수 기반 추정
+    tiktoken = None
+
+
+def make_token_counter(model: str):
+    """text -> 예상 토큰 수"""
+    if tiktoken is not None:
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            enc = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(enc.encode(text or ""))
+
+    def estimate(text: str) -> int:
+        # 영어는 대략 4글자당 1토큰, 한글 등 비ASCII는 글자당 1토큰 정도로 보수적으로 추정
+        t = text or ""
+        n_ascii = len(t.encode("ascii", "ignore"))  # 글자 단위 루프 대신 C 구현으로 셈
+        return max(1, n_ascii // 4 + (len(t) - n_ascii))
+
+    return estimate
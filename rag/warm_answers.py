@@ -0,0 +1,147 @@
+# rag/warm_answers.py
+# 예시 질문(챗봇 페이지 샘플 버튼)의 검색 결과 + 답변을 미리 만들어 두고 바로 돌려주기
+# - 질문 목록: rag/sample_questions.json (페이지 버튼도 같은 목록을 씀)
+# - 저장: data/warm_answers.json (index_info.json의 build_id와 같이 저장)
+#   → 지금 로드된 index의 build_id와 다르면 쓰지 않음 (새 빌드면 자동으로 무효)
+# - 갱신: build_index가 끝날 때 (--no-warm으로 끔), 또는 앱에서 build_id가 다르면 백그라운드로
+# 실행 (repo 루트에서): python -m rag.warm_answers   (지금 index로 다시 생성)
+import copy
+import json
+import os
+import threading
+
+from rag.single_flight import normalize_query
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_questions.json")
+WARM_PATH = "data/warm_answers.json"
+WARM_K = 4  # 챗봇 페이지의 answer(q, k=4)와 같아야 hit
+
+
+def load_questions(path: str = QUESTIONS_PATH) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return list(json.load(f).get("questions", []))
+
+
+SAMPLE_QUESTIONS = load_questions()
+
+_lock = threading.Lock()
+_store = None          # {"build_id", "k", "answers": {정규화 질문: {...}}}
+_store_stamp = None    # _store를 읽은 파일의 (mtime, size)
+_refreshing = False
+
+
+def _stamp(path: str = WARM_PATH):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_store(path: str = WARM_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print("[WARN] warm_answers.json을 읽지 못했습니다:", e)
+        return {}
+
+
+def _get_store(build_id=None) -> dict:
+    """
+    메모리의 답변 store. build_id(지금 index)와 다르면 파일을 다시 확인
+    - 새 빌드 / hot reload 후에는 build_index가 새로 써둔 파일을 읽어서 씀 (워커마다 다시 생성하지 않음)
+    - 파일도 그대로면(stat만 비교) 다시 읽지 않음
+    """
+    global _store, _store_stamp
+    if _store is not None and (build_id is None or _store.get("build_id") == build_id):
+        return _store
+    stamp = _stamp()
+    with _lock:
+        if _store is None or stamp != _store_stamp:
+            _store = _load_store()
+            _store_stamp = stamp
+        return _store
+
+
+def lookup(build_id, query: str, k: int):
+    """미리 만든 답변 (answer()와 같은 dict 복사본), 없으면 None"""
+    store = _get_store(build_id)
+    if not build_id or store.get("build_id") != build_id or store.get("k") != k:
+        return None
+    hit = store.get("answers", {}).get(normalize_query(query))
+    return copy.deepcopy(hit["result"]) if hit else None
+
+
+def refresh(questions=None, k: int = WARM_K, path: str = WARM_PATH) -> int:
+    """지금 엔진(rag_core.get_engine())으로 질문들의 검색 결과 + 답변 생성 → 저장, 생성한 개수"""
+    global _store, _store_stamp
+    import rag.rag_core as rc
+
+    questions = SAMPLE_QUESTIONS if questions is None else questions
+    # 도중에 hot reload로 엔진이 바뀌어도 전부 같은 index로 만들고 그 build_id로 저장
+    eng = rc.get_engine()
+    answers = {}
+    with rc.using_engine(eng):
+        for q in questions:
+            hits = rc.search(rc.embed_query(q), rc.search_k(k))  # [(score, int_id), ...]
+            result = rc._answer(q, k)
+            answers[normalize_query(q)] = {
+                "question": q,
+                "hits": [[score, cid] for score, cid in hits],
+                "result": result,
+            }
+
+    store = {"build_id": eng.info.get("build_id"), "k": k, "answers": answers}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(store, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    with _lock:
+        _store = store
+        _store_stamp = _stamp(path)
+    return len(answers)
+
+
+def refresh_async():
+    """로드된 index와 저장된 답변의 build_id가 다르면 백그라운드로 다시 생성 (프로세스당 동시에 하나)"""
+    global _refreshing
+    import rag.rag_core as rc
+
+    # 페이지 rerun마다 불려도 이미 맞으면(다른 프로세스가 새로 써둔 파일 포함) 스레드 없이 바로 끝
+    if rc.engine_loaded():
+        build_id = rc.get_engine().info.get("build_id")
+        if _get_store(build_id).get("build_id") == build_id:
+            return
+    with _lock:
+        if _refreshing:
+            return
+        _refreshing = True
+
+    def run():
+        global _refreshing
+        try:
+            build_id = rc.get_engine().info.get("build_id")
+            if build_id and _get_store(build_id).get("build_id") != build_id:
+                n = refresh()
+                print(f"[INFO] 예시 질문 답변 {n}개를 미리 만들었습니다.")
+        except Exception as e:
+            print("[WARN] 예시 질문 답변을 미리 만들지 못했습니다:", e)
+        finally:
+            with _lock:
+                _refreshing = False
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def main():
+    n = refresh()
+    print(f"✅ warmed {n} answers")
+    print(f"- saved: {WARM_PATH}")
+
+
+if __name__ == "__main__":
+    main()
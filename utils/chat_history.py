@@ -0,0 +1,97 @@
+# utils/chat_history.py
+# 챗봇 페이지의 대화 기록 (세션별)
+# - 최근 MAX_LIVE개 메시지만 그대로 들고 있고, 넘치면 오래된 것부터 ARCHIVE_BLOCK개씩 묶어서
+#   zlib 압축 블록으로 보관 (ARCHIVE_MAX_MESSAGES를 넘으면 가장 오래된 블록부터 버림)
+# - 말풍선 HTML은 메시지를 추가할 때 한 번만 escape/생성해서 같이 저장
+# - 화면에는 최근 window개만 그림 (그린 HTML은 기록이 바뀔 때까지 캐시)
+import html
+import json
+import re
+import zlib
+from collections import deque
+
+MAX_LIVE = 40
+ARCHIVE_BLOCK = 20
+ARCHIVE_MAX_MESSAGES = 1000
+
+# 답변 끝의 출처 문구 "[WHO의 ...](https://...)" → 링크 (escape 후에 변환)
+_MD_LINK = re.compile(r"\[([^\]\n]+)\]\((https?://[^\s)]+)\)")
+
+
+def message_html(text: str) -> str:
+    """메시지 본문 → 말풍선 안에 넣을 안전한 HTML"""
+    escaped = html.escape(text or "")
+    return _MD_LINK.sub(r'<a href="\2" target="_blank" rel="noopener">\1</a>', escaped)
+
+
+def bubble_html(role: str, text: str) -> str:
+    side = "user" if role == "user" else "bot"
+    return f'<div class="row {side}"><div class="bubble {side}">{message_html(text)}</div></div>'
+
+
+class ChatHistory:
+    def __init__(self, max_live: int = MAX_LIVE, block: int = ARCHIVE_BLOCK,
+                 archive_max_messages: int = ARCHIVE_MAX_MESSAGES):
+        self.max_live = max_live
+        self.block = block
+        self.archive_max_messages = archive_max_messages
+
+        self._live = deque()      # (role, text, bubble html)
+        self._archive = deque()   # (메시지 수, zlib 압축된 JSON [[role, text], ...]) 오래된 것부터
+        self.archived = 0         # 압축 보관 중인 메시지 수
+        self.dropped = 0          # 한도를 넘어 버린 메시지 수
+        self._version = 0
+        self._cache = (None, "")
+
+    def __len__(self):
+        return len(self._live) + self.archived
+
+    def add(self, role: str, text: str):
+        self._live.append((role, text, bubble_html(role, text)))
+        self._version += 1
+        if len(self._live) > self.max_live:
+            self._archive_oldest()
+
+    def _archive_oldest(self):
+        n = min(self.block, len(self._live))
+        batch = [self._live.popleft()[:2] for _ in range(n)]
+        data = zlib.compress(json.dumps(batch, ensure_ascii=False).encode("utf-8"))
+        self._archive.append((n, data))
+        self.archived += n
+        while self.archived > self.archive_max_messages and self._archive:
+            m, _ = self._archive.popleft()
+            self.archived -= m
+            self.dropped += m
+
+    def _archived_bubbles(self, need: int) -> list:
+        """압축 블록을 최신 것부터 풀어서 마지막 need개 말풍선 HTML (오래된 순서)"""
+        out = []
+        for _, data in reversed(self._archive):
+            if len(out) >= need:
+                break
+            msgs = json.loads(zlib.decompress(data).decode("utf-8"))
+            out = [bubble_html(role, text) for role, text in msgs] + out
+        return out[-need:] if need else []
+
+    def window_html(self, window: int) -> str:
+        """최근 window개 메시지의 말풍선 HTML (같은 기록/같은 window면 캐시)"""
+        key = (self._version, window)
+        if self._cache[0] == key:
+            return self._cache[1]
+
+        live = [b for _, _, b in self._live]
+        if window <= len(live):
+            parts = live[len(live) - window:]
+        else:
+            parts = self._archived_bubbles(window - len(live)) + live
+        out = "\n".join(parts)
+        self._cache = (key, out)
+        return out
+
+    def messages(self):
+        """(role, text) 전체 (압축 보관분 포함, 오래된 순서)"""
+        for _, data in self._archive:
+            for role, text in json.loads(zlib.decompress(data).decode("utf-8")):
+                yield role, text
+        for role, text, _ in self._live:
+            yield role, text